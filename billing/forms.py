@@ -76,7 +76,8 @@ class InvoiceItemForm(forms.ModelForm):
                 self.fields['product_name'].initial = product.name
                 
                 # Populate the product_quality choices
-                qualities = ProductQuality.objects.filter(product_id=product_id)
+                # The choices are labelled with str(quality), which reads its product
+                qualities = ProductQuality.objects.filter(product_id=product_id).select_related('product')
                 if qualities.exists():
                     self.fields['product_quality'].queryset = qualities
                     # If we're editing an existing item, don't override the selected quality
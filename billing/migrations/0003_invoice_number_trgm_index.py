@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # pg_trgm is PostgreSQL only; SQLite and MySQL keep the unique B-tree index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # icontains compiles to UPPER(col::text) LIKE UPPER(%s), so index that expression
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS inv_num_trgm ON billing_invoice '
+        'USING gin (UPPER(invoice_number::text) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS inv_num_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_invoice_payment_due_date_alter_invoice_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0003_invoice_number_trgm_index'),
+        ('customers', '0003_customer_search_trgm_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'created_at'], name='invoice_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['payment_type', 'created_at'], name='invoice_payment_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['customer', 'created_at'], name='invoice_customer_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 00:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_invoice_report_indexes'),
+        ('products', '0007_pricelist_error_message'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoiceitem',
+            index=models.Index(fields=['product', 'product_quality'], name='invoiceitem_product_idx'),
+        ),
+    ]
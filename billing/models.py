@@ -45,6 +45,12 @@ class Invoice(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Reports filter on a created_at range, usually excluding drafts, by payment type or per customer
+            models.Index(fields=['status', 'created_at'], name='invoice_status_created_idx'),
+            models.Index(fields=['payment_type', 'created_at'], name='invoice_payment_created_idx'),
+            models.Index(fields=['customer', 'created_at'], name='invoice_customer_created_idx'),
+        ]
     
     @property
     def amount_due(self):
@@ -78,3 +84,7 @@ class InvoiceItem(models.Model):
     
     class Meta:
         ordering = ['id']
+        indexes = [
+            # Product sales reports filter and group items by product and variant
+            models.Index(fields=['product', 'product_quality'], name='invoiceitem_product_idx'),
+        ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm is PostgreSQL only; SQLite and MySQL keep the plain table scan
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # icontains compiles to UPPER(col::text) LIKE UPPER(%s), so index that expression
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS customer_name_trgm ON customers_customer '
+        'USING gin (UPPER(name::text) gin_trgm_ops)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS customer_phone_trgm ON customers_customer '
+        'USING gin (UPPER(phone::text) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS customer_name_trgm')
+    schema_editor.execute('DROP INDEX IF EXISTS customer_phone_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_alter_customer_credit_limit_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
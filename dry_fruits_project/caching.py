@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+
+# Backends that keep their entries in a server outside the web workers, so an
+# entry dropped by one worker is gone for all of them. The process-local caches
+# (LocMem, Dummy) don't qualify; neither do the database and file caches, whose
+# lookups cost about as much as the queries they would cache
+SHARED_BACKENDS = {
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+}
+
+
+def cache_is_shared():
+    """Return whether the default cache is a Redis or Memcached server shared by every worker."""
+    return settings.CACHES['default']['BACKEND'] in SHARED_BACKENDS
+
+
+def new_version():
+    """Return a version number for cache keys that has not been used before.
+    
+    Versions are taken from the clock rather than counted up, so a version key
+    that expires or is evicted from the cache starts again at an unused number
+    instead of going back to entries cached under an old one.
+    """
+    return time.time_ns()
@@ -0,0 +1,169 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from .caching import cache_is_shared, new_version
+
+
+def invalidate_paginator_cache(namespace):
+    """Drop every count cached by CachingPaginator under namespace.
+    
+    Call it once the change has been committed (see transaction.on_commit), so
+    no count can be cached from the old data under the new generation.
+    """
+    if cache_is_shared():
+        cache.set(f'{namespace}:generation', new_version(), None)
+
+
+class CachingPaginator(Paginator):
+    """Paginator that caches the COUNT(*) of its queryset.
+
+    Counts are keyed by a hash of the queryset SQL (so each filter combination
+    gets its own entry) plus a generation number for the namespace, which
+    invalidate_paginator_cache() bumps when rows are added or removed. Counts
+    are only cached in a Redis or Memcached server shared by every worker (see
+    cache_is_shared()); otherwise the paginator runs its single COUNT query.
+    """
+
+    def __init__(self, object_list, per_page, namespace, timeout=300, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.namespace = namespace
+        self.timeout = timeout
+
+    @cached_property
+    def count(self):
+        if not cache_is_shared():
+            return super().count
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            return 0
+        generation = cache.get_or_set(f'{self.namespace}:generation', new_version, None)
+        key = f'{self.namespace}:count:{generation}:{hashlib.md5(sql.encode()).hexdigest()}'
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, self.timeout)
+        return count
+
+
+class CursorPage:
+    """A page of results fetched by CursorPaginator."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset pagination on (sort_field, pk) instead of OFFSET/LIMIT.
+
+    Each page is fetched with WHERE (sort_field, pk) > (last value, last pk)
+    ORDER BY sort_field, pk LIMIT per_page + 1, so the cost of a page does not
+    grow with its depth and no COUNT(*) query is needed. sort_field must be a
+    non-nullable field (related fields use the usual "product__name" syntax).
+    The queryset may also be a values() queryset whose rows include 'pk' and
+    the sort field.
+    """
+
+    def __init__(self, queryset, sort_field, per_page, descending=False):
+        self.queryset = queryset
+        self.sort_field = sort_field
+        self.per_page = per_page
+        self.descending = descending
+
+    def get_page(self, cursor=None):
+        """Return the page after (or before) the position encoded in cursor."""
+        position = self._decode(cursor)
+        forward = True
+        scan_descending = self.descending
+        queryset = self.queryset
+
+        if position is not None:
+            value, pk, forward = position
+            # Walking backwards scans in the opposite direction and reverses the rows
+            scan_descending = self.descending == forward
+            lookup = 'lt' if scan_descending else 'gt'
+            try:
+                queryset = queryset.filter(
+                    Q(**{f'{self.sort_field}__{lookup}': value}) |
+                    Q(**{self.sort_field: value, f'pk__{lookup}': pk})
+                )
+            except (ValidationError, ValueError, TypeError):
+                # A tampered cursor falls back to the first page
+                position = None
+                forward = True
+                scan_descending = self.descending
+
+        if scan_descending:
+            queryset = queryset.order_by(f'-{self.sort_field}', '-pk')
+        else:
+            queryset = queryset.order_by(self.sort_field, 'pk')
+
+        # Fetch one extra row to find out whether there is another page
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if not rows:
+            return CursorPage(rows)
+
+        if forward:
+            has_next, has_previous = has_more, position is not None
+        else:
+            has_next, has_previous = True, has_more
+
+        return CursorPage(
+            rows,
+            next_cursor=self._encode(rows[-1], True) if has_next else None,
+            previous_cursor=self._encode(rows[0], False) if has_previous else None,
+        )
+
+    def _sort_value(self, obj):
+        if isinstance(obj, dict):
+            return obj[self.sort_field]
+        value = obj
+        for attr in self.sort_field.split('__'):
+            value = getattr(value, attr)
+        return value
+
+    def _encode(self, obj, forward):
+        pk = obj['pk'] if isinstance(obj, dict) else obj.pk
+        payload = json.dumps([str(self._sort_value(obj)), pk, forward])
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def _decode(self, cursor):
+        """Decode a cursor, treating a missing or malformed one as the first page."""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            value, pk, forward = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            return None
+        return value, pk, bool(forward)
@@ -0,0 +1,5 @@
+class Echo:
+    """File-like object whose write() returns the value, so csv.writer output can be streamed."""
+    
+    def write(self, value):
+        return value
@@ -3,16 +3,23 @@ from django.utils import timezone
 from datetime import timedelta
 from .models import Payment, Reminder
 
+# Shared widget attributes (Widget copies attrs on init, so reuse is safe)
+_AMOUNT_ATTRS = {'class': 'form-control', 'step': '0.01', 'min': '0.01'}
+_SELECT_ATTRS = {'class': 'form-select'}
+_NOTES_ATTRS = {'class': 'form-control', 'rows': 3, 'placeholder': 'Additional notes...'}
+_SEARCH_ATTRS = {'class': 'form-control', 'placeholder': 'Search by invoice # or customer...'}
+_DATE_ATTRS = {'class': 'form-control', 'type': 'date'}
+
 class PaymentForm(forms.ModelForm):
     """Form for creating and updating payments."""
     class Meta:
         model = Payment
         fields = ['amount', 'payment_method', 'reference_number', 'notes']
         widgets = {
-            'amount': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': '0.01'}),
-            'payment_method': forms.Select(attrs={'class': 'form-select'}),
+            'amount': forms.NumberInput(attrs=_AMOUNT_ATTRS),
+            'payment_method': forms.Select(attrs=_SELECT_ATTRS),
             'reference_number': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Reference number (optional)'}),
-            'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Additional notes...'}),
+            'notes': forms.Textarea(attrs=_NOTES_ATTRS),
         }
 
 class ReminderForm(forms.ModelForm):
@@ -21,8 +28,8 @@ class ReminderForm(forms.ModelForm):
         model = Reminder
         fields = ['reminder_type', 'notes']
         widgets = {
-            'reminder_type': forms.Select(attrs={'class': 'form-select'}),
-            'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Additional notes...'}),
+            'reminder_type': forms.Select(attrs=_SELECT_ATTRS),
+            'notes': forms.Textarea(attrs=_NOTES_ATTRS),
         }
 
 class PaymentSearchForm(forms.Form):
@@ -37,25 +44,25 @@ class PaymentSearchForm(forms.Form):
     
     query = forms.CharField(
         required=False,
-        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Search by invoice # or customer...'})
+        widget=forms.TextInput(attrs=_SEARCH_ATTRS)
     )
     status = forms.ChoiceField(
         choices=STATUS_CHOICES,
         required=False,
-        widget=forms.Select(attrs={'class': 'form-select'})
+        widget=forms.Select(attrs=_SELECT_ATTRS)
     )
     payment_method = forms.ChoiceField(
         choices=PAYMENT_METHOD_CHOICES,
         required=False,
-        widget=forms.Select(attrs={'class': 'form-select'})
+        widget=forms.Select(attrs=_SELECT_ATTRS)
     )
     date_from = forms.DateField(
         required=False,
-        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+        widget=forms.DateInput(attrs=_DATE_ATTRS)
     )
     date_to = forms.DateField(
         required=False,
-        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+        widget=forms.DateInput(attrs=_DATE_ATTRS)
     )
     
     def __init__(self, *args, **kwargs):
@@ -76,12 +83,12 @@ class PendingPaymentSearchForm(forms.Form):
     
     query = forms.CharField(
         required=False,
-        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Search by invoice # or customer...'})
+        widget=forms.TextInput(attrs=_SEARCH_ATTRS)
     )
     overdue_status = forms.ChoiceField(
         choices=OVERDUE_CHOICES,
         required=False,
-        widget=forms.Select(attrs={'class': 'form-select'})
+        widget=forms.Select(attrs=_SELECT_ATTRS)
     )
     min_amount = forms.DecimalField(
         required=False,
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from authentication.models import User
 from customers.models import Customer
@@ -39,27 +39,30 @@ class Payment(models.Model):
     
     def save(self, *args, **kwargs):
         """Override save method to update invoice amount_paid."""
-        super().save(*args, **kwargs)
-        
-        # Update invoice amount_paid
-        if self.status == 'completed':
-            invoice = self.invoice
-            total_paid = Payment.objects.filter(
-                invoice=invoice, 
-                status='completed'
-            ).aggregate(models.Sum('amount'))['amount__sum'] or 0
+        with transaction.atomic():
+            super().save(*args, **kwargs)
             
-            invoice.amount_paid = total_paid
-            
-            # Update invoice status
-            if total_paid >= invoice.total:
-                invoice.status = 'paid'
-            elif total_paid > 0:
-                invoice.status = 'partially_paid'
-            else:
-                invoice.status = 'issued'
-            
-            invoice.save()
+            # Update invoice amount_paid
+            if self.status == 'completed':
+                # Lock the invoice row so concurrent payments are applied one at a time
+                invoice = Invoice.objects.select_for_update().get(pk=self.invoice_id)
+                total_paid = Payment.objects.filter(
+                    invoice_id=self.invoice_id, 
+                    status='completed'
+                ).aggregate(total=models.Sum('amount'))['total'] or 0
+                
+                invoice.amount_paid = total_paid
+                
+                # Update invoice status
+                if total_paid >= invoice.total:
+                    invoice.status = 'paid'
+                elif total_paid > 0:
+                    invoice.status = 'partially_paid'
+                else:
+                    invoice.status = 'issued'
+                
+                invoice.save()
+                self.invoice = invoice
 
 class Reminder(models.Model):
     """Model for storing payment reminder information."""
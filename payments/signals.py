@@ -0,0 +1,24 @@
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from billing.models import Invoice
+from customers.models import Customer
+from dry_fruits_project.pagination import invalidate_paginator_cache
+from .models import Payment
+
+# Both lists are searched by invoice number and customer name or phone, so their
+# counts change with the invoices and customers as well as their own rows
+
+@receiver([post_save, post_delete], sender=Payment)
+@receiver([post_save, post_delete], sender=Invoice)
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_payment_counts(sender, **kwargs):
+    """Refresh the cached page counts of the payment list once the change is committed."""
+    transaction.on_commit(partial(invalidate_paginator_cache, 'payments'))
+
+@receiver([post_save, post_delete], sender=Invoice)
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_pending_invoice_counts(sender, **kwargs):
+    """Refresh the cached page counts of the pending payment list once the change is committed."""
+    transaction.on_commit(partial(invalidate_paginator_cache, 'pending_invoices'))
@@ -0,0 +1,14 @@
+from django.utils import timezone
+from .models import Reminder
+
+def send_reminders(reminder_ids):
+    """Send pending reminders and mark them as sent.
+    
+    Reminders are not delivered through an email/SMS provider yet, so this only
+    records the send. Views schedule it with transaction.on_commit() so the work
+    can move to a background worker without changing the call sites.
+    """
+    return Reminder.objects.filter(pk__in=reminder_ids, status='pending').update(
+        status='sent',
+        sent_at=timezone.now()
+    )
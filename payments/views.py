@@ -2,14 +2,16 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
-from django.db.models import Q, Sum, F, ExpressionWrapper, DecimalField
+from django.db import connection, transaction
+from django.db.models import Q, Sum, Count, F, ExpressionWrapper, DecimalField
 from django.utils import timezone
-from django.core.paginator import Paginator
 from authentication.decorators import executive_required
+from dry_fruits_project.pagination import CachingPaginator
 from customers.models import Customer
 from billing.models import Invoice
 from .models import Payment, Reminder
 from .forms import PaymentForm, ReminderForm, PaymentSearchForm, PendingPaymentSearchForm
+from .tasks import send_reminders
 from datetime import timedelta
 
 @login_required
@@ -17,7 +19,10 @@ from datetime import timedelta
 def payment_list(request):
     """View for listing all payments."""
     form = PaymentSearchForm(request.GET)
-    payments = Payment.objects.all()
+    payments = Payment.objects.select_related('invoice', 'customer').only(
+        'id', 'amount', 'status', 'payment_method', 'reference_number', 'created_at',
+        'invoice__id', 'invoice__invoice_number', 'customer__id', 'customer__name',
+    )
     
     if form.is_valid():
         query = form.cleaned_data.get('query')
@@ -26,30 +31,35 @@ def payment_list(request):
         date_from = form.cleaned_data.get('date_from')
         date_to = form.cleaned_data.get('date_to')
         
+        # Build a single Q expression so the queryset is filtered once
+        filters = Q()
+        
         if query:
-            payments = payments.filter(
+            filters &= (
                 Q(invoice__invoice_number__icontains=query) | 
                 Q(customer__name__icontains=query) |
                 Q(customer__phone__icontains=query)
             )
         
         if status:
-            payments = payments.filter(status=status)
+            filters &= Q(status=status)
         
         if payment_method:
-            payments = payments.filter(payment_method=payment_method)
+            filters &= Q(payment_method=payment_method)
         
         if date_from:
-            payments = payments.filter(created_at__date__gte=date_from)
+            filters &= Q(created_at__date__gte=date_from)
         
         if date_to:
-            payments = payments.filter(created_at__date__lte=date_to)
+            filters &= Q(created_at__date__lte=date_to)
+        
+        payments = payments.filter(filters)
     
     # Get summary statistics
     total_amount = payments.filter(status='completed').aggregate(total=Sum('amount'))['total'] or 0
     
     # Paginate the results
-    paginator = Paginator(payments, 10)  # Show 10 payments per page
+    paginator = CachingPaginator(payments, 10, 'payments')  # Show 10 payments per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
@@ -64,10 +74,15 @@ def payment_list(request):
 def pending_payment_list(request):
     """View for listing pending payments."""
     form = PendingPaymentSearchForm(request.GET)
+    today = timezone.now().date()
+    seven_days_later = today + timedelta(days=7)
     
     # Get invoices with pending payments - anything that's not paid or cancelled
     invoices = Invoice.objects.exclude(
         Q(status='paid') | Q(status='cancelled') | Q(status='draft')
+    ).select_related('customer').only(
+        'id', 'invoice_number', 'status', 'total', 'amount_paid', 'payment_due_date', 'created_at',
+        'customer__id', 'customer__name', 'customer__phone',
     ).order_by('-created_at')
     
     # Annotate with calculated_amount_due instead of amount_due to avoid property conflict
@@ -84,64 +99,60 @@ def pending_payment_list(request):
         min_amount = form.cleaned_data.get('min_amount')
         max_amount = form.cleaned_data.get('max_amount')
         
+        # Build a single Q expression so the queryset is filtered once
+        filters = Q()
+        
         if query:
-            invoices = invoices.filter(
+            filters &= (
                 Q(invoice_number__icontains=query) | 
                 Q(customer__name__icontains=query) |
                 Q(customer__phone__icontains=query)
             )
         
         if overdue_status:
-            today = timezone.now().date()
             if overdue_status == 'overdue':
-                invoices = invoices.filter(payment_due_date__lt=today)
+                filters &= Q(payment_due_date__lt=today)
             elif overdue_status == 'due_soon':
-                seven_days_later = today + timedelta(days=7)
-                invoices = invoices.filter(payment_due_date__gte=today, payment_due_date__lte=seven_days_later)
+                filters &= Q(payment_due_date__gte=today, payment_due_date__lte=seven_days_later)
         
         if min_amount:
-            invoices = invoices.filter(calculated_amount_due__gte=min_amount)
+            filters &= Q(calculated_amount_due__gte=min_amount)
         
         if max_amount:
-            invoices = invoices.filter(calculated_amount_due__lte=max_amount)
+            filters &= Q(calculated_amount_due__lte=max_amount)
+        
+        invoices = invoices.filter(filters)
     
-    # Get summary statistics using the annotated field
-    total_pending = invoices.aggregate(total=Sum('calculated_amount_due'))['total'] or 0
-
-    # For overdue and due soon, we need to filter first then sum
-    today = timezone.now().date()
-    overdue_invoices = invoices.filter(payment_due_date__lt=today)
-    overdue_amount = overdue_invoices.aggregate(total=Sum('calculated_amount_due'))['total'] or 0
-    overdue_count = overdue_invoices.count()
-
-    due_soon_invoices = invoices.filter(
-        payment_due_date__gte=today,
-        payment_due_date__lte=today + timedelta(days=7)
+    # Get all summary statistics in a single aggregate query
+    amount_due = F('total') - F('amount_paid')
+    overdue = Q(payment_due_date__lt=today)
+    due_soon = Q(payment_due_date__gte=today, payment_due_date__lte=seven_days_later)
+    no_due_date = Q(payment_due_date__isnull=True)
+    summary = invoices.aggregate(
+        total_pending=Sum(amount_due, default=0),
+        overdue_amount=Sum(amount_due, filter=overdue, default=0),
+        overdue_count=Count('id', filter=overdue),
+        due_soon_amount=Sum(amount_due, filter=due_soon, default=0),
+        due_soon_count=Count('id', filter=due_soon),
+        no_due_date_amount=Sum(amount_due, filter=no_due_date, default=0),
+        no_due_date_count=Count('id', filter=no_due_date),
     )
-    due_soon_amount = due_soon_invoices.aggregate(total=Sum('calculated_amount_due'))['total'] or 0
-    due_soon_count = due_soon_invoices.count()
-
-    # Also count invoices with no payment due date set
-    no_due_date_invoices = invoices.filter(payment_due_date__isnull=True)
-    no_due_date_count = no_due_date_invoices.count()
-    no_due_date_amount = no_due_date_invoices.aggregate(total=Sum('calculated_amount_due'))['total'] or 0
     
     # Paginate the results
-    paginator = Paginator(invoices, 10)  # Show 10 invoices per page
+    paginator = CachingPaginator(invoices, 10, 'pending_invoices')  # Show 10 invoices per page
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
     return render(request, 'payments/pending_payments.html', {
         'page_obj': page_obj,
         'form': form,
-        'total_pending': total_pending,
-        'overdue_amount': overdue_amount,
-        'due_soon_amount': due_soon_amount,
-        'overdue_count': overdue_count,
-        'due_soon_count': due_soon_count,
-        'no_due_date_count': no_due_date_count,
-        'no_due_date_amount': no_due_date_amount,
-        'invoices': invoices,
+        'total_pending': summary['total_pending'],
+        'overdue_amount': summary['overdue_amount'],
+        'due_soon_amount': summary['due_soon_amount'],
+        'overdue_count': summary['overdue_count'],
+        'due_soon_count': summary['due_soon_count'],
+        'no_due_date_count': summary['no_due_date_count'],
+        'no_due_date_amount': summary['no_due_date_amount'],
         'today': today
     })
 
@@ -284,11 +295,8 @@ def reminder_create(request, invoice_id):
             reminder.created_by = request.user
             reminder.save()
             
-            # In a real application, you would send the actual reminder here
-            # For now, we'll just mark it as sent
-            reminder.status = 'sent'
-            reminder.sent_at = timezone.now()
-            reminder.save()
+            # Send the reminder once the row is committed
+            transaction.on_commit(lambda: send_reminders([reminder.id]))
             
             messages.success(request, 'Reminder sent successfully.')
             return redirect('invoice_detail', pk=invoice.id)
@@ -306,7 +314,10 @@ def reminder_create(request, invoice_id):
 def customer_payment_history(request, customer_id):
     """View for displaying a customer's payment history."""
     customer = get_object_or_404(Customer, pk=customer_id)
-    payments = Payment.objects.filter(customer=customer)
+    payments = Payment.objects.filter(customer=customer).select_related('invoice', 'customer').only(
+        'id', 'amount', 'status', 'payment_method', 'reference_number', 'created_at',
+        'invoice__id', 'invoice__invoice_number', 'customer__id', 'customer__name',
+    )
     invoices = Invoice.objects.filter(customer=customer)
     
     # Get summary statistics
@@ -336,22 +347,45 @@ def bulk_reminder(request):
             messages.error(request, 'No invoices selected.')
             return redirect('pending_payment_list')
         
-        # Create reminders for each selected invoice
-        for invoice_id in invoice_ids:
-            invoice = get_object_or_404(Invoice, pk=invoice_id)
+        # Fetch the selected invoices in one query, skipping ids that don't match one
+        requested_ids = {invoice_id for invoice_id in invoice_ids if invoice_id.isdigit()}
+        invoices = list(Invoice.objects.filter(pk__in=requested_ids).only('id', 'customer_id'))
+        missing_count = len(set(invoice_ids)) - len(invoices)
+        
+        if not invoices:
+            messages.error(request, 'None of the selected invoices could be found.')
+            return redirect('pending_payment_list')
+        
+        # Create the reminders with one INSERT in a single transaction
+        with transaction.atomic():
+            started_at = timezone.now()
+            reminders = Reminder.objects.bulk_create([
+                Reminder(
+                    invoice=invoice,
+                    customer_id=invoice.customer_id,
+                    reminder_type=reminder_type,
+                    notes=notes,
+                    created_by=request.user
+                )
+                for invoice in invoices
+            ])
+            if connection.features.can_return_rows_from_bulk_insert:
+                reminder_ids = [reminder.id for reminder in reminders]
+            else:
+                # MySQL doesn't return the new primary keys, so read them back
+                reminder_ids = list(Reminder.objects.filter(
+                    invoice__in=invoices,
+                    created_by=request.user,
+                    status='pending',
+                    created_at__gte=started_at,
+                ).values_list('id', flat=True))
             
-            reminder = Reminder(
-                invoice=invoice,
-                customer=invoice.customer,
-                reminder_type=reminder_type,
-                notes=notes,
-                created_by=request.user,
-                status='sent',
-                sent_at=timezone.now()
-            )
-            reminder.save()
+            # Send all reminders together once the transaction commits
+            transaction.on_commit(lambda: send_reminders(reminder_ids))
         
-        messages.success(request, f'Reminders sent to {len(invoice_ids)} customers.')
+        messages.success(request, f'Reminders sent to {len(invoices)} customers.')
+        if missing_count:
+            messages.warning(request, f'{missing_count} selected invoices could not be found and were skipped.')
         return redirect('pending_payment_list')
     
     return redirect('pending_payment_list')
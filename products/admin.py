@@ -19,6 +19,6 @@ class ProductQualityAdmin(admin.ModelAdmin):
 
 @admin.register(PriceList)
 class PriceListAdmin(admin.ModelAdmin):
-    list_display = ('id', 'uploaded_by', 'uploaded_at', 'processed')
+    list_display = ('id', 'uploaded_by', 'uploaded_at', 'processed', 'error_message')
     list_filter = ('processed',)
-    readonly_fields = ('uploaded_at',)
+    readonly_fields = ('uploaded_at', 'error_message')
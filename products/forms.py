@@ -1,6 +1,9 @@
 from django import forms
 from .models import Product, ProductQuality, PriceList
 
+# Shared widget attributes (Widget copies attrs on init, so reuse is safe)
+_PRICE_ATTRS = {'step': '0.01', 'min': '0'}
+
 class ProductForm(forms.ModelForm):
     """Form for creating and updating products."""
     class Meta:
@@ -17,10 +20,10 @@ class ProductQualityForm(forms.ModelForm):
         model = ProductQuality
         fields = ['quality', 'retail_price', 'wholesale_price', 'broker_price', 'stock_quantity']
         widgets = {
-            'retail_price': forms.NumberInput(attrs={'step': '0.01', 'min': '0'}),
-            'wholesale_price': forms.NumberInput(attrs={'step': '0.01', 'min': '0'}),
-            'broker_price': forms.NumberInput(attrs={'step': '0.01', 'min': '0'}),
-            'stock_quantity': forms.NumberInput(attrs={'step': '0.01', 'min': '0'})
+            'retail_price': forms.NumberInput(attrs=_PRICE_ATTRS),
+            'wholesale_price': forms.NumberInput(attrs=_PRICE_ATTRS),
+            'broker_price': forms.NumberInput(attrs=_PRICE_ATTRS),
+            'stock_quantity': forms.NumberInput(attrs=_PRICE_ATTRS)
         }
 
 class PriceListUploadForm(forms.ModelForm):
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_image_url'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='productquality',
+            constraint=models.UniqueConstraint(fields=('product', 'quality'), name='uq_product_quality'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productquality',
+            unique_together=set(),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name'], name='product_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productquality',
+            index=models.Index(fields=['quality', 'id'], name='pq_quality_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productquality',
+            index=models.Index(fields=['retail_price', 'id'], name='pq_retail_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productquality',
+            index=models.Index(fields=['wholesale_price', 'id'], name='pq_wholesale_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productquality',
+            index=models.Index(fields=['broker_price', 'id'], name='pq_broker_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productquality',
+            index=models.Index(fields=['stock_quantity', 'id'], name='pq_stock_quantity_idx'),
+        ),
+    ]
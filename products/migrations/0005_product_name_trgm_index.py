@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # pg_trgm is PostgreSQL only; SQLite and MySQL keep the plain table scan
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # icontains compiles to UPPER(col::text) LIKE UPPER(%s), so index that expression
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_name_trgm ON products_product '
+        'USING gin (UPPER(name::text) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS product_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
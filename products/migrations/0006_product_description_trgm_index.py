@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # pg_trgm is PostgreSQL only; SQLite and MySQL keep the plain table scan
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # product_list ORs name and description matches, so both sides need an index
+    # for the planner to combine them instead of scanning the table
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_description_trgm ON products_product '
+        'USING gin (UPPER(description::text) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS product_description_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_name_trgm_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
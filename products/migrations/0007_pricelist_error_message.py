@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-15 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_description_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricelist',
+            name='error_message',
+            field=models.TextField(blank=True, help_text='Why the file could not be processed'),
+        ),
+    ]
@@ -15,6 +15,9 @@ class Product(models.Model):
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['name'], name='product_name_idx'),
+        ]
 
 class ProductQuality(models.Model):
     """Model for storing product quality variants."""
@@ -37,8 +40,18 @@ class ProductQuality(models.Model):
         return f"{self.product.name} - {self.get_quality_display()}"
     
     class Meta:
-        unique_together = ('product', 'quality')
         verbose_name_plural = 'Product Qualities'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'quality'], name='uq_product_quality'),
+        ]
+        # Keyset pagination in product_list orders by (sort column, id)
+        indexes = [
+            models.Index(fields=['quality', 'id'], name='pq_quality_idx'),
+            models.Index(fields=['retail_price', 'id'], name='pq_retail_price_idx'),
+            models.Index(fields=['wholesale_price', 'id'], name='pq_wholesale_price_idx'),
+            models.Index(fields=['broker_price', 'id'], name='pq_broker_price_idx'),
+            models.Index(fields=['stock_quantity', 'id'], name='pq_stock_quantity_idx'),
+        ]
 
 class PriceList(models.Model):
     """Model for storing uploaded price lists."""
@@ -46,6 +59,7 @@ class PriceList(models.Model):
     uploaded_by = models.ForeignKey('authentication.User', on_delete=models.SET_NULL, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     processed = models.BooleanField(default=False)
+    error_message = models.TextField(blank=True, help_text="Why the file could not be processed")
     
     def __str__(self):
         return f"Price List #{self.id} ({self.uploaded_at.strftime('%Y-%m-%d')})"
@@ -0,0 +1,197 @@
+import logging
+import pandas as pd
+from django.db import connection, transaction
+from django.db.models import Count
+from reports.cache import invalidate_report_cache
+from .models import Product, ProductQuality, PriceList
+
+logger = logging.getLogger(__name__)
+
+# python-calamine reads xlsx files several times faster than openpyxl; without it
+# pandas picks its default engine for the file type
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = None
+
+# Rows per INSERT when applying an uploaded price list
+PRICE_LIST_BATCH_SIZE = 1000
+
+# Required price list columns and their possible alternative names, in order of preference
+PRICE_LIST_COLUMNS = {
+    'Product Name': ['product name', 'product', 'name', 'item name', 'item'],
+    'Quality': ['quality', 'grade', 'variant', 'type'],
+    'Retail Price': ['retail price', 'retail', 'mrp', 'price'],
+    'Wholesale Price': ['wholesale price', 'wholesale', 'bulk price'],
+    'Broker Price': ['broker price', 'broker', 'agent price', 'distributor price']
+}
+
+# Lowercase header -> (standard column, preference), built once at import
+PRICE_LIST_COLUMN_ALIASES = {
+    alias: (standard_col, preference)
+    for standard_col, alternatives in PRICE_LIST_COLUMNS.items()
+    for preference, alias in enumerate([standard_col.lower(), *alternatives])
+}
+
+def process_price_list(price_list_id):
+    """Apply an uploaded price list Excel file to the product catalogue.
+    
+    Takes the PriceList id rather than the instance so the call can be handed to
+    a background worker unchanged; uploads currently run it in the request. If
+    the file can't be applied the reason is stored on the price list and the
+    error is re-raised for the caller to report.
+    """
+    price_list = PriceList.objects.get(pk=price_list_id)
+    try:
+        # Read just the header row first - no header parameter needed now since we removed the instruction row
+        path = price_list.file.path
+        header = pd.read_excel(path, nrows=0, engine=EXCEL_ENGINE).columns
+        
+        # Debug: Print all column names found in the file
+        logger.info(f"Columns found in Excel file: {list(header)}")
+        
+        # Standardize column names (convert to lowercase for case-insensitive matching)
+        columns = [str(col).strip() for col in header]
+        
+        # Match every header against the alias map in one pass, keeping the most preferred
+        # spelling when a file has several columns for the same standard column
+        matches = {}
+        for col in columns:
+            match = PRICE_LIST_COLUMN_ALIASES.get(col.lower())
+            if match is None:
+                continue
+            standard_col, preference = match
+            if standard_col not in matches or preference < matches[standard_col][1]:
+                matches[standard_col] = (col, preference)
+        
+        for standard_col in PRICE_LIST_COLUMNS:
+            if standard_col not in matches:
+                # List all columns found in the file to help with debugging
+                found_cols = ", ".join(columns)
+                raise ValueError(f"Missing required column: {standard_col}. Columns found: {found_cols}")
+        
+        # Create a mapping from actual columns to standard column names
+        actual_to_standard = {col: standard_col for standard_col, (col, _) in matches.items()}
+        
+        if 'Stock Quantity' in columns:
+            actual_to_standard['Stock Quantity'] = 'Stock Quantity'
+        
+        # Load only the mapped columns, reading names and qualities as text so that
+        # pandas doesn't infer (and then discard) numeric types for them
+        text_cols = {col for col, standard_col in actual_to_standard.items() if standard_col in ('Product Name', 'Quality')}
+        raw_names = dict(zip(columns, header))
+        df = pd.read_excel(
+            path,
+            usecols=[raw_names[col] for col in actual_to_standard],
+            dtype={raw_names[col]: str for col in text_cols},
+            engine=EXCEL_ENGINE,
+        )
+        df.columns = [str(col).strip() for col in df.columns]
+        
+        # Rename columns to standard names
+        df = df.rename(columns=actual_to_standard)
+        
+        # Check if we have all required columns after mapping
+        for required_col in ['Product Name', 'Quality', 'Retail Price', 'Wholesale Price', 'Broker Price']:
+            if required_col not in df.columns:
+                raise ValueError(f"Missing required column after mapping: {required_col}")
+        
+        # Clean whole columns at once rather than row by row, skipping rows with empty product names
+        df = df.dropna(subset=['Product Name'])
+        df['Product Name'] = df['Product Name'].astype(str).str.strip()
+        df = df[df['Product Name'] != '']
+        df['Quality'] = df['Quality'].astype(str).str.lower().str.strip()
+        
+        # Convert prices to numbers, reporting every row with a non-numeric value
+        price_cols = ['Retail Price', 'Wholesale Price', 'Broker Price']
+        df[price_cols] = df[price_cols].apply(pd.to_numeric, errors='coerce')
+        invalid = df[price_cols].isna().any(axis=1)
+        if invalid.any():
+            invalid_names = ", ".join(f"'{name}'" for name in df.loc[invalid, 'Product Name'].unique())
+            raise ValueError(f"Invalid price value for product {invalid_names}. Prices must be numbers.")
+        
+        # Stock quantity is optional; missing or non-numeric values count as 0
+        if 'Stock Quantity' in df.columns:
+            df['Stock Quantity'] = pd.to_numeric(df['Stock Quantity'], errors='coerce').fillna(0)
+        else:
+            df['Stock Quantity'] = 0
+        
+        rows = list(df[['Product Name', 'Quality', *price_cols, 'Stock Quantity']].itertuples(index=False, name=None))
+        processed_count = len(rows)
+        if processed_count == 0:
+            raise ValueError("No valid product data found in the file. Please check the format and try again.")
+        
+        # Apply the whole sheet in one transaction so an upload is never left half applied;
+        # rows are written in batches to keep each statement a bounded size
+        with transaction.atomic():
+            # Product names aren't unique, so refuse to guess which of several products
+            # with the same name a row's prices belong to
+            names = {row[0] for row in rows}
+            duplicates = sorted(
+                Product.objects.filter(name__in=names)
+                .values('name').annotate(count=Count('id')).filter(count__gt=1)
+                .values_list('name', flat=True)
+            )
+            if duplicates:
+                duplicate_names = ", ".join(f"'{name}'" for name in duplicates)
+                raise ValueError(
+                    f"More than one product is named {duplicate_names}. "
+                    "Rename or remove the duplicates before uploading the price list."
+                )
+            
+            # Map every product name to its id, creating the products that don't exist yet
+            product_ids = dict(Product.objects.filter(name__in=names).values_list('name', 'id'))
+            new_products = Product.objects.bulk_create(
+                [Product(name=name) for name in names if name not in product_ids],
+                batch_size=PRICE_LIST_BATCH_SIZE,
+            )
+            if connection.features.can_return_rows_from_bulk_insert:
+                product_ids.update((product.name, product.id) for product in new_products)
+            elif new_products:
+                # MySQL doesn't return the new primary keys, so read them back
+                product_ids = dict(Product.objects.filter(name__in=names).values_list('name', 'id'))
+            
+            # Later rows for the same product and quality win, as they did when saved one by one
+            qualities = {}
+            for product_name, quality, retail_price, wholesale_price, broker_price, stock_quantity in rows:
+                qualities[product_ids[product_name], quality] = ProductQuality(
+                    product_id=product_ids[product_name],
+                    quality=quality,
+                    retail_price=retail_price,
+                    wholesale_price=wholesale_price,
+                    broker_price=broker_price,
+                    stock_quantity=stock_quantity,
+                )
+            
+            # Insert new quality variants and update the prices of existing ones together: each batch
+            # is one INSERT ... ON CONFLICT DO UPDATE (ON DUPLICATE KEY UPDATE on MySQL), so existing
+            # rows are never updated one at a time. MySQL resolves conflicts against every unique key
+            # and does not accept unique_fields.
+            unique_fields = None
+            if connection.features.supports_update_conflicts_with_target:
+                unique_fields = ['product', 'quality']
+            ProductQuality.objects.bulk_create(
+                qualities.values(),
+                update_conflicts=True,
+                unique_fields=unique_fields,
+                update_fields=['retail_price', 'wholesale_price', 'broker_price', 'stock_quantity', 'updated_at'],
+                batch_size=PRICE_LIST_BATCH_SIZE,
+            )
+            
+            # Mark the price list as processed
+            price_list.processed = True
+            price_list.error_message = ''
+            price_list.save(update_fields=['processed', 'error_message'])
+        
+        # bulk_create doesn't send post_save, so retire the cached reports (and their
+        # variant choices) here
+        invalidate_report_cache()
+        
+        logger.info(f"Successfully processed {processed_count} products from price list")
+        
+    except Exception as e:
+        logger.error(f"Error processing price list: {str(e)}", exc_info=True)
+        price_list.error_message = str(e)
+        price_list.save(update_fields=['error_message'])
+        raise
@@ -1,8 +1,14 @@
 import io
 import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.styles import Font, Alignment, PatternFill
 from openpyxl.utils import get_column_letter
 
+# Header styles are immutable, so one instance is shared by every cell
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_FILL = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+HEADER_ALIGNMENT = Alignment(horizontal='center')
+COLUMN_WIDTHS = (20, 15, 15, 15, 15, 15)
+
 def generate_price_list_template():
     """Generate an Excel template for price list uploads."""
     wb = openpyxl.Workbook()
@@ -28,28 +34,20 @@ def generate_price_list_template():
         ["Walnuts", "Standard", 900, 800, 750, 120],
     ]
     
-    # Add headers directly (no instruction row)
-    header_row = 1
-    for col_num, header in enumerate(headers, 1):
-        col_letter = get_column_letter(col_num)
-        ws[f'{col_letter}{header_row}'] = header
-        ws[f'{col_letter}{header_row}'].font = Font(bold=True)
-        ws[f'{col_letter}{header_row}'].fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        ws[f'{col_letter}{header_row}'].font = Font(bold=True, color="FFFFFF")
-        ws[f'{col_letter}{header_row}'].alignment = Alignment(horizontal='center')
+    # Add headers directly (no instruction row), then the sample rows
+    ws.append(headers)
+    for row_data in sample_data:
+        ws.append(row_data)
     
-    # Add sample data
-    for row_num, row_data in enumerate(sample_data, header_row + 1):
-        for col_num, cell_value in enumerate(row_data, 1):
-            ws.cell(row=row_num, column=col_num, value=cell_value)
+    # Style the header row
+    for cell in ws[1]:
+        cell.font = HEADER_FONT
+        cell.fill = HEADER_FILL
+        cell.alignment = HEADER_ALIGNMENT
     
     # Set column widths
-    ws.column_dimensions['A'].width = 20
-    ws.column_dimensions['B'].width = 15
-    ws.column_dimensions['C'].width = 15
-    ws.column_dimensions['D'].width = 15
-    ws.column_dimensions['E'].width = 15
-    ws.column_dimensions['F'].width = 15
+    for col_num, width in enumerate(COLUMN_WIDTHS, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = width
     
     # Save to in-memory file
     output = io.BytesIO()
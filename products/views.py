@@ -1,26 +1,40 @@
-import pandas as pd
+import csv
 import logging
+import openpyxl
+from io import BytesIO
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.db.models import Q
-from django.core.paginator import Paginator
 from authentication.decorators import admin_required, executive_required
+from dry_fruits_project.pagination import CursorPaginator
+from dry_fruits_project.streaming import Echo
 from .models import Product, ProductQuality, PriceList
 from .forms import ProductForm, ProductQualityForm, PriceListUploadForm, ProductSearchForm
+from .tasks import process_price_list
 from .utils import generate_price_list_template
 
 logger = logging.getLogger(__name__)
 
+# Columns the product list can be sorted on (all non-nullable, as keyset pagination requires)
+PRODUCT_SORT_FIELDS = ('product__name', 'quality', 'retail_price', 'wholesale_price', 'broker_price', 'stock_quantity')
+
+# Header row of the current products export, matching the price list upload columns
+PRODUCT_EXPORT_HEADERS = ['Product Name', 'Quality', 'Retail Price', 'Wholesale Price', 'Broker Price', 'Stock Quantity']
+
 @login_required
 @executive_required
 def product_list(request):
     """View for listing all products in table format."""
     form = ProductSearchForm(request.GET)
     
-    # Get all product qualities with related product data
-    product_qualities = ProductQuality.objects.select_related('product').all()
+    # Get all product qualities with related product data as plain value rows,
+    # loading only the columns the list shows
+    product_qualities = ProductQuality.objects.values(
+        'pk', 'quality', 'retail_price', 'wholesale_price', 'broker_price', 'stock_quantity',
+        'product_id', 'product__name', 'product__description',
+    )
     
     # Search functionality
     if form.is_valid():
@@ -37,26 +51,28 @@ def product_list(request):
     
     # Sorting functionality
     sort_by = request.GET.get('sort', 'product__name')
+    if sort_by not in PRODUCT_SORT_FIELDS:
+        sort_by = 'product__name'
     sort_order = request.GET.get('order', 'asc')
     
-    if sort_order == 'desc':
-        sort_by = f'-{sort_by}'
-    
-    product_qualities = product_qualities.order_by(sort_by)
-    
     # Get unique quality choices for filter dropdown
     quality_choices = ProductQuality.QUALITY_CHOICES
     
-    paginator = Paginator(product_qualities, 50)  # Show 50 products per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination on (sort column, id) avoids OFFSET scans and the COUNT(*) query
+    paginator = CursorPaginator(product_qualities, sort_by, 50, descending=sort_order == 'desc')  # Show 50 products per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    
+    # Label each row's quality from a dict rather than get_quality_display() on a model
+    quality_labels = dict(quality_choices)
+    for product_quality in page_obj:
+        product_quality['quality_display'] = quality_labels.get(product_quality['quality'], product_quality['quality'])
     
     return render(request, 'products/product_list.html', {
         'page_obj': page_obj,
         'form': form,
         'quality_choices': quality_choices,
         'current_quality_filter': quality_filter,
-        'current_sort': request.GET.get('sort', 'product__name'),
+        'current_sort': sort_by,
         'current_order': sort_order,
     })
 
@@ -153,7 +169,7 @@ def quality_create(request, product_pk):
 @admin_required
 def quality_update(request, pk):
     """View for updating a quality variant."""
-    quality = get_object_or_404(ProductQuality, pk=pk)
+    quality = get_object_or_404(ProductQuality.objects.select_related('product'), pk=pk)
     
     if request.method == 'POST':
         form = ProductQualityForm(request.POST, instance=quality)
@@ -175,7 +191,7 @@ def quality_update(request, pk):
 @admin_required
 def quality_delete(request, pk):
     """View for deleting a quality variant."""
-    quality = get_object_or_404(ProductQuality, pk=pk)
+    quality = get_object_or_404(ProductQuality.objects.select_related('product'), pk=pk)
     product_pk = quality.product.pk
     
     if request.method == 'POST':
@@ -199,7 +215,7 @@ def price_list_upload(request):
             price_list.save()
             
             try:
-                process_price_list(price_list)
+                process_price_list(price_list.id)
                 messages.success(request, 'Price list uploaded and processed successfully!')
             except Exception as e:
                 messages.error(request, f'Error processing price list: {str(e)}')
@@ -213,115 +229,6 @@ def price_list_upload(request):
         'form': form,
     })
 
-def process_price_list(price_list):
-    """Process the uploaded price list Excel file."""
-    try:
-        # Read the Excel file - no header parameter needed now since we removed the instruction row
-        df = pd.read_excel(price_list.file.path)
-        
-        # Debug: Print all column names found in the file
-        logger.info(f"Columns found in Excel file: {list(df.columns)}")
-        
-        # Define required columns and their possible alternative names
-        column_mapping = {
-            'Product Name': ['product name', 'product', 'name', 'item name', 'item'],
-            'Quality': ['quality', 'grade', 'variant', 'type'],
-            'Retail Price': ['retail price', 'retail', 'mrp', 'price'],
-            'Wholesale Price': ['wholesale price', 'wholesale', 'bulk price'],
-            'Broker Price': ['broker price', 'broker', 'agent price', 'distributor price']
-        }
-        
-        # Standardize column names (convert to lowercase for case-insensitive matching)
-        df.columns = [str(col).strip() for col in df.columns]
-        
-        # Create a mapping from actual columns to standard column names
-        actual_to_standard = {}
-        for standard_col, alternatives in column_mapping.items():
-            found = False
-            for alt in [standard_col.lower()] + alternatives:
-                matching_cols = [col for col in df.columns if col.lower() == alt]
-                if matching_cols:
-                    actual_to_standard[matching_cols[0]] = standard_col
-                    found = True
-                    break
-            
-            if not found:
-                # List all columns found in the file to help with debugging
-                found_cols = ", ".join(df.columns)
-                raise ValueError(f"Missing required column: {standard_col}. Columns found: {found_cols}")
-        
-        # Rename columns to standard names
-        df = df.rename(columns=actual_to_standard)
-        
-        # Check if we have all required columns after mapping
-        for required_col in ['Product Name', 'Quality', 'Retail Price', 'Wholesale Price', 'Broker Price']:
-            if required_col not in df.columns:
-                raise ValueError(f"Missing required column after mapping: {required_col}")
-        
-        # Process each row in the Excel file
-        processed_count = 0
-        for _, row in df.iterrows():
-            # Skip rows with empty product names
-            if pd.isna(row['Product Name']) or str(row['Product Name']).strip() == '':
-                continue
-                
-            product_name = str(row['Product Name']).strip()
-            quality = str(row['Quality']).lower().strip()
-            
-            # Convert prices to float, handling any non-numeric values
-            try:
-                retail_price = float(row['Retail Price'])
-                wholesale_price = float(row['Wholesale Price'])
-                broker_price = float(row['Broker Price'])
-            except (ValueError, TypeError):
-                raise ValueError(f"Invalid price value for product '{product_name}'. Prices must be numbers.")
-            
-            # Handle stock quantity if present
-            stock_quantity = 0
-            if 'Stock Quantity' in df.columns and not pd.isna(row['Stock Quantity']):
-                try:
-                    stock_quantity = float(row['Stock Quantity'])
-                except (ValueError, TypeError):
-                    stock_quantity = 0
-            
-            # Get or create the product
-            product, _ = Product.objects.get_or_create(name=product_name)
-            
-            # Get or create the quality variant
-            quality_obj, created = ProductQuality.objects.get_or_create(
-                product=product,
-                quality=quality,
-                defaults={
-                    'retail_price': retail_price,
-                    'wholesale_price': wholesale_price,
-                    'broker_price': broker_price,
-                    'stock_quantity': stock_quantity,
-                }
-            )
-            
-            # If the quality variant already exists, update its prices
-            if not created:
-                quality_obj.retail_price = retail_price
-                quality_obj.wholesale_price = wholesale_price
-                quality_obj.broker_price = broker_price
-                quality_obj.stock_quantity = stock_quantity
-                quality_obj.save()
-            
-            processed_count += 1
-        
-        if processed_count == 0:
-            raise ValueError("No valid product data found in the file. Please check the format and try again.")
-        
-        # Mark the price list as processed
-        price_list.processed = True
-        price_list.save()
-        
-        logger.info(f"Successfully processed {processed_count} products from price list")
-        
-    except Exception as e:
-        logger.error(f"Error processing price list: {str(e)}", exc_info=True)
-        raise
-
 @login_required
 @executive_required
 def product_search_api(request):
@@ -331,60 +238,79 @@ def product_search_api(request):
     if not query:
         return JsonResponse({'products': []})
     
-    # Search by name
-    products = Product.objects.filter(name__icontains=query)[:10]
+    # Search by name; plain value rows avoid building model instances
+    products = list(Product.objects.filter(name__icontains=query).values_list('id', 'name')[:10])
     
-    product_list = []
-    for product in products:
-        qualities = []
-        for quality in product.qualities.all():
-            qualities.append({
-                'id': quality.id,
-                'name': quality.get_quality_display(),
-                'retail_price': float(quality.retail_price),
-                'wholesale_price': float(quality.wholesale_price),
-                'broker_price': float(quality.broker_price),
-                'stock_quantity': float(quality.stock_quantity),
-            })
-        
-        product_list.append({
-            'id': product.id,
-            'name': product.name,
-            'qualities': qualities,
+    # Fetch the qualities of all matched products in one query and group them by product
+    quality_labels = dict(ProductQuality.QUALITY_CHOICES)
+    qualities_by_product = {product_id: [] for product_id, _ in products}
+    qualities = ProductQuality.objects.filter(product_id__in=qualities_by_product).order_by('id').values(
+        'id', 'product_id', 'quality', 'retail_price', 'wholesale_price', 'broker_price', 'stock_quantity'
+    )
+    for quality in qualities:
+        qualities_by_product[quality['product_id']].append({
+            'id': quality['id'],
+            'name': quality_labels.get(quality['quality'], quality['quality']),
+            'retail_price': float(quality['retail_price']),
+            'wholesale_price': float(quality['wholesale_price']),
+            'broker_price': float(quality['broker_price']),
+            'stock_quantity': float(quality['stock_quantity']),
         })
     
+    product_list = [
+        {
+            'id': product_id,
+            'name': name,
+            'qualities': qualities_by_product[product_id],
+        }
+        for product_id, name in products
+    ]
+    
     return JsonResponse({'products': product_list})
 
 @login_required
 @admin_required
 def download_price_list_template(request):
-    """View to download current product data as Excel file."""
+    """View to download current product data as Excel file (or CSV with ?format=csv)."""
     try:
-        # Get all product qualities with related product data
-        product_qualities = ProductQuality.objects.select_related('product').all()
+        # Fetch plain value rows and look quality labels up in a dict built once,
+        # rather than instantiating models and calling get_quality_display() per row
+        quality_labels = dict(ProductQuality.QUALITY_CHOICES)
+        product_qualities = ProductQuality.objects.values_list(
+            'product__name', 'quality', 'retail_price', 'wholesale_price', 'broker_price', 'stock_quantity'
+        )
         
-        # Prepare data for Excel export
-        data = []
-        for pq in product_qualities:
-            data.append({
-                'Product Name': pq.product.name,
-                'Quality': pq.get_quality_display(),
-                'Retail Price': float(pq.retail_price),
-                'Wholesale Price': float(pq.wholesale_price),
-                'Broker Price': float(pq.broker_price),
-                'Stock Quantity': float(pq.stock_quantity),
-            })
+        if request.GET.get('format') == 'csv':
+            # Stream CSV rows to the client as they are read, without building the file in memory
+            writer = csv.writer(Echo())
+            
+            def rows():
+                yield writer.writerow(PRODUCT_EXPORT_HEADERS)
+                for name, quality, *values in product_qualities.iterator(chunk_size=5000):
+                    yield writer.writerow([name, quality_labels.get(quality, quality), *values])
+            
+            response = StreamingHttpResponse(rows(), content_type='text/csv')
+            response['Content-Disposition'] = 'attachment; filename="current_products_list.csv"'
+            return response
         
-        # Create DataFrame
-        df = pd.DataFrame(data)
+        # Write rows straight into a write-only workbook as they are fetched in chunks,
+        # instead of collecting them in a list and a DataFrame first
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet('Products')
+        ws.append(PRODUCT_EXPORT_HEADERS)
+        for name, quality, retail_price, wholesale_price, broker_price, stock_quantity in product_qualities.iterator(chunk_size=2000):
+            ws.append([
+                name,
+                quality_labels.get(quality, quality),
+                float(retail_price),
+                float(wholesale_price),
+                float(broker_price),
+                float(stock_quantity),
+            ])
         
         # Create Excel file in memory
-        from io import BytesIO
         output = BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Products', index=False)
-        
+        wb.save(output)
         output.seek(0)
         
         # Create the HttpResponse with appropriate headers
@@ -0,0 +1,53 @@
+import hashlib
+
+from django.core.cache import cache
+
+from dry_fruits_project.caching import cache_is_shared, new_version
+from products.models import ProductQuality
+
+# How long a computed report is served from the cache
+REPORT_CACHE_TIMEOUT = 300
+
+VERSION_KEY = 'reports:version'
+
+
+def invalidate_report_cache():
+    """Drop every cached report by moving on to a new version number.
+    
+    Call it once the change has been committed (see transaction.on_commit), so
+    no report can be rebuilt from the old data under the new version.
+    """
+    if cache_is_shared():
+        cache.set(VERSION_KEY, new_version(), None)
+
+
+def cached_report(build, *args):
+    """Return build(*args), cached under the report's name and arguments.
+
+    Entries are keyed by the current report version, so invalidate_report_cache()
+    retires them all at once when the underlying data changes. Unless the default
+    cache is a Redis or Memcached server shared by every worker (see
+    cache_is_shared()), the report is built on every request instead.
+    """
+    if not cache_is_shared():
+        return build(*args)
+    version = cache.get_or_set(VERSION_KEY, new_version, None)
+    digest = hashlib.md5(repr(args).encode()).hexdigest()
+    key = f'reports:{build.__name__}:{version}:{digest}'
+    report = cache.get(key)
+    if report is None:
+        report = build(*args)
+        cache.set(key, report, REPORT_CACHE_TIMEOUT)
+    return report
+
+
+def _product_variants():
+    return list(ProductQuality.objects.values_list('quality', flat=True).distinct())
+
+
+def product_variants():
+    """Return the distinct product variants offered by the product report filter.
+    
+    They are cached with the reports, and retired with them when a variant is saved.
+    """
+    return cached_report(_product_variants)
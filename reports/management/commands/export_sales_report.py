@@ -0,0 +1,43 @@
+import argparse
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from reports.forms import SalesReportForm
+from reports.views import export_sales_report
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the sales report export to a file. Long date ranges can be exported "
+        "this way as a scheduled task, without holding a web worker for the whole build."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the file to write')
+        parser.add_argument('--from', dest='date_from', type=parse_date, required=True)
+        parser.add_argument('--to', dest='date_to', type=parse_date, required=True)
+        parser.add_argument('--grouping', choices=dict(SalesReportForm.GROUPING_CHOICES), default='day')
+        parser.add_argument('--payment-type', choices=dict(SalesReportForm.PAYMENT_TYPE_CHOICES), default='all')
+        parser.add_argument('--customer', default='', help='Only invoices of customers whose name contains this')
+        parser.add_argument('--format', dest='file_format', choices=['excel', 'csv'], default='excel')
+
+    def handle(self, *args, **options):
+        response = export_sales_report(
+            None, options['date_from'], options['date_to'], options['grouping'],
+            options['payment_type'], options['customer'], file_format=options['file_format']
+        )
+        try:
+            with open(options['output'], 'wb') as output:
+                for chunk in response.streaming_content:
+                    output.write(chunk)
+        finally:
+            response.close()
+        self.stdout.write(self.style.SUCCESS(f"Sales report written to {options['output']}"))
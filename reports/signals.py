@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from billing.models import Invoice, InvoiceItem
+from customers.models import Customer
+from products.models import Product, ProductQuality
+from .cache import invalidate_report_cache
+
+@receiver([post_save, post_delete], sender=Invoice)
+@receiver([post_save, post_delete], sender=InvoiceItem)
+@receiver([post_save, post_delete], sender=Customer)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductQuality)
+def invalidate_reports(sender, **kwargs):
+    """Recompute the cached reports after the invoices or the names they show change."""
+    transaction.on_commit(invalidate_report_cache)
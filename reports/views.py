@@ -1,33 +1,174 @@
 import datetime
+import re
+from calendar import monthrange
 from datetime import timedelta
+from decimal import Decimal
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, F, Q, ExpressionWrapper, DecimalField, Value, OuterRef, Subquery
-from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, Coalesce
-from django.http import HttpResponse
+from django.db.models import (
+    Sum, Count, F, Q, ExpressionWrapper, DecimalField, Value, OuterRef, Subquery,
+    Case, When, CharField, DateField, FloatField
+)
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, Coalesce, Cast
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils import timezone
 import json
 import csv
+import tempfile
+from urllib.parse import quote
 import xlwt
 import logging
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Cell styles shared by the Excel exports, built once rather than per export
+HEADER_STYLE = xlwt.easyxf('font: bold on; align: wrap on, vert centre, horiz center')
+DATE_STYLE = xlwt.easyxf('align: wrap on, vert centre, horiz center', num_format_str='DD-MM-YYYY')
+AMOUNT_STYLE = xlwt.easyxf('align: wrap on, vert centre, horiz right', num_format_str='#,##0.00')
+
+# Width of every export column, in 1/256ths of a character
+COLUMN_WIDTH = 4000
+
+# Data rows written to one export sheet before continuing on a new one; an xls
+# sheet holds at most 65,536 rows including the header and totals rows
+SHEET_ROWS = 60000
+
 from authentication.decorators import executive_required
+from dry_fruits_project.streaming import Echo
 from billing.models import Invoice, InvoiceItem
 from customers.models import Customer
-from products.models import Product, ProductQuality
+from products.models import Product
+from .cache import cached_report, product_variants
 from .forms import (
     SalesReportForm, ProductReportForm, CustomerReportForm, 
     CreditReportForm, InventoryReportForm, ExportDataForm
 )
 
+# A minimum quantity filter: digits with an optional decimal part
+QUANTITY_RE = re.compile(r'\d+(\.\d+)?')
+
+# strftime formats of the sales report period labels, by grouping
+PERIOD_FORMATS = {
+    'day': '%Y-%m-%d',
+    'week': 'Week %U, %Y',
+    'month': '%B %Y',
+}
+
+def created_between(start_date, end_date, field='created_at'):
+    """Return a filter for rows created on any day from start_date to end_date.
+    
+    The days are turned into a half-open range of aware datetimes rather than
+    filtering on created_at__date, whose date cast keeps the database from using
+    the indexes on created_at. field names the datetime to filter on, such as
+    'invoice__created_at' for a related model's.
+    """
+    start = timezone.make_aware(datetime.datetime.combine(start_date, datetime.time.min))
+    end = timezone.make_aware(datetime.datetime.combine(end_date + timedelta(days=1), datetime.time.min))
+    return Q(**{f'{field}__gte': start, f'{field}__lt': end})
+
+def parse_quantity(value):
+    """Return value as a Decimal if it is a plain non-negative number such as "2" or "2.5", else None."""
+    value = value.strip()
+    if not QUANTITY_RE.fullmatch(value):
+        return None
+    return Decimal(value)
+
+def _last_month(today):
+    """Return the first and last day of the month before today."""
+    year, month = (today.year - 1, 12) if today.month == 1 else (today.year, today.month - 1)
+    return datetime.date(year, month, 1), datetime.date(year, month, monthrange(year, month)[1])
+
+# Date ranges for the quick filter links, as functions of today's date
+QUICK_FILTERS = {
+    'today': lambda today: (today, today),
+    'yesterday': lambda today: (today - timedelta(days=1), today - timedelta(days=1)),
+    'this_week': lambda today: (today - timedelta(days=today.weekday()), today),
+    'this_month': lambda today: (today.replace(day=1), today),
+    'last_month': _last_month,
+}
+
+def date_range_label(start_date, end_date):
+    """Return the date range for an export filename, formatting each date once."""
+    start = start_date.isoformat()
+    if start_date == end_date:
+        return start
+    return f'{start}_to_{end_date.isoformat()}'
+
+def filename_part(value, length=40):
+    """Return user input shortened to length characters and percent-quoted for an export filename."""
+    return quote(value[:length], safe='')
+
+def write_header_row(worksheet, headers, width=COLUMN_WIDTH):
+    """Write the bold header row of an export sheet and give its columns one width."""
+    for col, header in enumerate(headers):
+        worksheet.write(0, col, header, HEADER_STYLE)
+        worksheet.col(col).width = width
+
+def xls_response(workbook, filename):
+    """Return a finished xlwt workbook as a download streamed from a temporary file.
+    
+    Saving into the HttpResponse kept a second, serialized copy of the sheet in
+    memory until the response was sent; the temporary file is read back in chunks
+    and removed once the response is closed.
+    """
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=filename, content_type='application/ms-excel')
+
 @login_required
 def report_list(request):
     """View for report list."""
     return render(request, 'reports/report_list.html')
 
+# Per-period sums of the sales report, also aggregated over all the invoices for its totals
+SALES_SUMS = {
+    'bills': Count('id'),
+    'total_sale': Sum('total', default=0),
+    'cash_sale': Sum('total', filter=Q(payment_type='cash'), default=0),
+    'upi_sale': Sum('total', filter=Q(payment_type='upi'), default=0),
+    'credit_sale': Sum('total', filter=Q(payment_type='credit'), default=0),
+}
+
+def _sales_queryset(start_date, end_date, grouping, payment_type, customer_filter):
+    """Return the invoices matching the sales report filters and their sums per period.
+    
+    Shared by the report page and its exports so both always cover the same invoices.
+    """
+    # Get all invoices except drafts
+    invoices = Invoice.objects.exclude(status='draft')
+    
+    # Apply date range filter if provided
+    if start_date and end_date:
+        invoices = invoices.filter(created_between(start_date, end_date))
+    
+    # Apply payment type filter
+    if payment_type != 'all':
+        invoices = invoices.filter(payment_type=payment_type)
+    
+    # Apply customer filter if provided, matching names on the customers table
+    # (where the trigram index on UPPER(name) applies) rather than per invoice row
+    if customer_filter:
+        invoices = invoices.filter(
+            customer__in=Customer.objects.filter(name__icontains=customer_filter).values('pk')
+        )
+    
+    # Determine the grouping function based on user selection
+    if grouping == 'week':
+        trunc_func = TruncWeek('created_at')
+    elif grouping == 'month':
+        trunc_func = TruncMonth('created_at')
+    else:  # default to day
+        trunc_func = TruncDay('created_at')
+    
+    # Group by selected period
+    sales_data = invoices.annotate(
+        period=trunc_func
+    ).values('period').annotate(**SALES_SUMS).order_by('period')
+    
+    return invoices, sales_data
+
 @login_required
 def sales_report(request):
     """View for sales report."""
@@ -50,38 +191,15 @@ def sales_report(request):
             
             # If exporting to Excel
             if 'export' in request.POST:
-                return export_sales_report(request, start_date, end_date, grouping, payment_type, customer_filter)
+                return export_sales_report(
+                    request, start_date, end_date, grouping, payment_type, customer_filter,
+                    file_format='csv' if request.POST['export'] == 'csv' else 'excel'
+                )
     else:
         # Check for quick filter in GET parameters
-        quick_filter = request.GET.get('quick_filter', '')
-        if quick_filter == 'today':
-            start_date = end_date = timezone.now().date()
-        elif quick_filter == 'yesterday':
-            start_date = end_date = timezone.now().date() - timedelta(days=1)
-        elif quick_filter == 'this_week':
-            today = timezone.now().date()
-            start_date = today - timedelta(days=today.weekday())
-            end_date = today
-        elif quick_filter == 'this_month':
-            today = timezone.now().date()
-            start_date = today.replace(day=1)
-            end_date = today
-        elif quick_filter == 'last_month':
-            today = timezone.now().date()
-            if today.month == 1:
-                start_date = today.replace(year=today.year-1, month=12, day=1)
-                end_date = today.replace(year=today.year-1, month=12, day=31)
-            else:
-                start_date = today.replace(month=today.month-1, day=1)
-                last_day = 31
-                if today.month-1 in [4, 6, 9, 11]:
-                    last_day = 30
-                elif today.month-1 == 2:
-                    if today.year % 4 == 0 and (today.year % 100 != 0 or today.year % 400 == 0):
-                        last_day = 29
-                    else:
-                        last_day = 28
-                end_date = today.replace(month=today.month-1, day=last_day)
+        quick_range = QUICK_FILTERS.get(request.GET.get('quick_filter', ''))
+        if quick_range:
+            start_date, end_date = quick_range(timezone.now().date())
         
         form = SalesReportForm(initial={
             'date_from': start_date,
@@ -91,67 +209,26 @@ def sales_report(request):
             'customer': customer_filter
         })
     
-    # Get all invoices except drafts
-    invoices = Invoice.objects.exclude(status='draft')
-    
-    # Apply date range filter
-    invoices = invoices.filter(
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date
-    )
-    
-    # Apply payment type filter
-    if payment_type != 'all':
-        invoices = invoices.filter(payment_type=payment_type)
-    
-    # Apply customer filter if provided
-    if customer_filter:
-        invoices = invoices.filter(customer__name__icontains=customer_filter)
-    
-    # Determine the grouping function based on user selection
-    if grouping == 'week':
-        trunc_func = TruncWeek('created_at')
-    elif grouping == 'month':
-        trunc_func = TruncMonth('created_at')
-    else:  # default to day
-        trunc_func = TruncDay('created_at')
+    context = {
+        'form': form,
+        **cached_report(_sales_report_data, start_date, end_date, grouping, payment_type, customer_filter),
+        'start_date': start_date,
+        'end_date': end_date
+    }
     
-    # Group by selected period
-    sales_data = invoices.annotate(
-        period=trunc_func
-    ).values('period').annotate(
-        total_sale=Sum('total', default=0),
-        bills=Count('id'),
-        cash_sale=Sum(
-            F('total'),
-            filter=Q(payment_type='cash'),
-            default=0
-        ),
-        upi_sale=Sum(
-            F('total'),
-            filter=Q(payment_type='upi'),
-            default=0
-        ),
-        credit_sale=Sum(
-            F('total'),
-            filter=Q(payment_type='credit'),
-            default=0
-        )
-    ).order_by('period')
+    return render(request, 'reports/sales_report.html', context)
+
+def _sales_report_data(start_date, end_date, grouping, payment_type, customer_filter):
+    """Compute the sales report table, totals and payment mode split for the given filters."""
+    invoices, sales_data = _sales_queryset(start_date, end_date, grouping, payment_type, customer_filter)
     
-    # Format data for template
+    # Format data for template, with one strftime call per period
+    period_format = PERIOD_FORMATS.get(grouping, PERIOD_FORMATS['month'])
     table_data = []
     for entry in sales_data:
         if entry['period']:
-            if grouping == 'day':
-                formatted_date = entry['period'].strftime('%Y-%m-%d')
-            elif grouping == 'week':
-                formatted_date = f"Week {entry['period'].strftime('%U')}, {entry['period'].strftime('%Y')}"
-            else:  # month
-                formatted_date = entry['period'].strftime('%B %Y')
-                
             table_data.append({
-                'date': formatted_date,
+                'date': entry['period'].strftime(period_format),
                 'bills': entry['bills'],
                 'total_sale': entry['total_sale'] or 0,
                 'cash_sale': entry['cash_sale'] or 0,
@@ -159,12 +236,13 @@ def sales_report(request):
                 'credit_sale': entry['credit_sale'] or 0
             })
     
-    # Calculate totals
-    total_bills = sum(entry['bills'] for entry in table_data) if table_data else 0
-    total_sales = sum(entry['total_sale'] for entry in table_data) if table_data else 0
-    total_cash = sum(entry['cash_sale'] for entry in table_data) if table_data else 0
-    total_upi = sum(entry['upi_sale'] for entry in table_data) if table_data else 0
-    total_credit = sum(entry['credit_sale'] for entry in table_data) if table_data else 0
+    # Calculate totals over the same filtered invoices in the database
+    totals = invoices.aggregate(**SALES_SUMS)
+    total_bills = totals['bills']
+    total_sales = totals['total_sale']
+    total_cash = totals['cash_sale']
+    total_upi = totals['upi_sale']
+    total_credit = totals['credit_sale']
     
     # Calculate percentages for payment modes
     total_paid = total_cash + total_upi + total_credit
@@ -181,8 +259,7 @@ def sales_report(request):
     else:
         date_range_display = f"{start_date.strftime('%d %b %Y')} - {end_date.strftime('%d %b %Y')}"
     
-    context = {
-        'form': form,
+    return {
         'table_data': table_data,
         'total_bills': total_bills,
         'total_sales': total_sales,
@@ -192,117 +269,85 @@ def sales_report(request):
         'cash_percent': cash_percent,
         'upi_percent': upi_percent,
         'credit_percent': credit_percent,
-        'date_range_display': date_range_display,
-        'start_date': start_date,
-        'end_date': end_date
+        'date_range_display': date_range_display
     }
-    
-    return render(request, 'reports/sales_report.html', context)
 
-def export_sales_report(request, start_date=None, end_date=None, grouping='day', payment_type='all', customer_filter=''):
-    """Export sales report to Excel."""
-    # Get all invoices except drafts
-    invoices = Invoice.objects.exclude(status='draft')
+def export_sales_report(request, start_date=None, end_date=None, grouping='day', payment_type='all', customer_filter='',
+                        file_format='excel'):
+    """Export sales report to Excel, or stream it as CSV when file_format is 'csv'."""
+    invoices, sales_data = _sales_queryset(start_date, end_date, grouping, payment_type, customer_filter)
     
-    # Apply date range filter if provided
+    # Include filter information in filename
+    current_date = timezone.now().strftime('%Y-%m-%d')
+    filename_parts = ['Sales_Report']
     if start_date and end_date:
-        invoices = invoices.filter(
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
-        )
+        filename_parts.append(date_range_label(start_date, end_date))
     
-    # Apply payment type filter
     if payment_type != 'all':
-        invoices = invoices.filter(payment_type=payment_type)
+        filename_parts.append(payment_type)
     
-    # Apply customer filter if provided
-    if customer_filter:
-        invoices = invoices.filter(customer__name__icontains=customer_filter)
+    filename_parts.append(current_date)
+    filename = '_'.join(filename_parts)
     
-    # Determine the grouping function based on user selection
-    if grouping == 'week':
-        trunc_func = TruncWeek('created_at')
-    elif grouping == 'month':
-        trunc_func = TruncMonth('created_at')
-    else:  # default to day
-        trunc_func = TruncDay('created_at')
+    headers = [
+        'Date', 'Bills Generated', 'Total Sale', 
+        'Cash', 'UPI/Card', 'Credit'
+    ]
+    amount_keys = ('total_sale', 'cash_sale', 'upi_sale', 'credit_sale')
     
-    # Group by selected period
-    sales_data = invoices.annotate(
-        period=trunc_func
-    ).values('period').annotate(
-        bills=Count('id'),
-        total_sale=Sum('total', default=0),
-        cash_sale=Sum('total', filter=Q(payment_type='cash'), default=0),
-        upi_sale=Sum('total', filter=Q(payment_type='upi'), default=0),
-        credit_sale=Sum('total', filter=Q(payment_type='credit'), default=0)
-    ).order_by('period')
+    if file_format == 'csv':
+        # Stream CSV rows to the client as they are read; xlwt can only write a whole workbook
+        writer = csv.writer(Echo())
+        
+        def rows():
+            yield writer.writerow(headers)
+            for entry in sales_data.iterator(chunk_size=2000):
+                period = entry['period'].date() if grouping == 'day' else entry['period']
+                yield writer.writerow([period, entry['bills'], *(entry[key] or 0 for key in amount_keys)])
+            totals = invoices.aggregate(**SALES_SUMS)
+            yield writer.writerow(['Total', totals['bills'], *(totals[key] for key in amount_keys)])
+        
+        response = StreamingHttpResponse(rows(), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+        return response
     
     # Create workbook and add a worksheet
     workbook = xlwt.Workbook(encoding='utf-8')
     worksheet = workbook.add_sheet('Sales Report')
     
-    # Define styles
-    header_style = xlwt.easyxf('font: bold on; align: wrap on, vert centre, horiz center')
-    date_style = xlwt.easyxf('align: wrap on, vert centre, horiz center', num_format_str='DD-MM-YYYY')
-    amount_style = xlwt.easyxf('align: wrap on, vert centre, horiz right', num_format_str='#,##0.00')
-    
     # Write header row
-    headers = [
-        'Date', 'Bills Generated', 'Total Sale', 
-        'Cash', 'UPI/Card', 'Credit'
-    ]
+    write_header_row(worksheet, headers)
     
-    for col, header in enumerate(headers):
-        worksheet.write(0, col, header, header_style)
-        worksheet.col(col).width = 4000  # Set column width
+    # Day periods are written as dates; week and month periods as plain text
+    period_style = DATE_STYLE if grouping == 'day' else xlwt.Style.default_style
     
-    # Write data rows
-    for row, entry in enumerate(sales_data, 1):
+    # Write data rows, streaming them from the database in chunks
+    row = 0
+    for row, entry in enumerate(sales_data.iterator(chunk_size=2000), 1):
         if grouping == 'day':
             date_value = entry['period'].date()
         else:
             # For week and month, just use the string representation
             date_value = str(entry['period'])
         
-        worksheet.write(row, 0, date_value, date_style if isinstance(date_value, (datetime.date, datetime.datetime)) else None)
+        worksheet.write(row, 0, date_value, period_style)
         worksheet.write(row, 1, entry['bills'])
-        worksheet.write(row, 2, float(entry['total_sale'] or 0), amount_style)
-        worksheet.write(row, 3, float(entry['cash_sale'] or 0), amount_style)
-        worksheet.write(row, 4, float(entry['upi_sale'] or 0), amount_style)
-        worksheet.write(row, 5, float(entry['credit_sale'] or 0), amount_style)
-    
-    # Write totals row
-    row = len(sales_data) + 1
-    worksheet.write(row, 0, 'Total', header_style)
-    worksheet.write(row, 1, sum(entry['bills'] for entry in sales_data), header_style)
-    worksheet.write(row, 2, float(sum(entry['total_sale'] or 0 for entry in sales_data)), amount_style)
-    worksheet.write(row, 3, float(sum(entry['cash_sale'] or 0 for entry in sales_data)), amount_style)
-    worksheet.write(row, 4, float(sum(entry['upi_sale'] or 0 for entry in sales_data)), amount_style)
-    worksheet.write(row, 5, float(sum(entry['credit_sale'] or 0 for entry in sales_data)), amount_style)
-    
-    # Create HTTP response with Excel file
-    response = HttpResponse(content_type='application/ms-excel')
-    current_date = timezone.now().strftime('%Y-%m-%d')
-    
-    # Include filter information in filename
-    filename_parts = ['Sales_Report']
-    if start_date and end_date:
-        if start_date == end_date:
-            filename_parts.append(start_date.strftime('%Y-%m-%d'))
-        else:
-            filename_parts.append(f"{start_date.strftime('%Y-%m-%d')}_to_{end_date.strftime('%Y-%m-%d')}")
-    
-    if payment_type != 'all':
-        filename_parts.append(payment_type)
-    
-    filename_parts.append(current_date)
-    filename = '_'.join(filename_parts) + '.xls'
-    
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    workbook.save(response)
-    
-    return response
+        worksheet.write(row, 2, float(entry['total_sale'] or 0), AMOUNT_STYLE)
+        worksheet.write(row, 3, float(entry['cash_sale'] or 0), AMOUNT_STYLE)
+        worksheet.write(row, 4, float(entry['upi_sale'] or 0), AMOUNT_STYLE)
+        worksheet.write(row, 5, float(entry['credit_sale'] or 0), AMOUNT_STYLE)
+    
+    # Write totals row, aggregated over the same invoices in the database
+    totals = invoices.aggregate(**SALES_SUMS)
+    row += 1
+    worksheet.write(row, 0, 'Total', HEADER_STYLE)
+    worksheet.write(row, 1, totals['bills'], HEADER_STYLE)
+    worksheet.write(row, 2, float(totals['total_sale']), AMOUNT_STYLE)
+    worksheet.write(row, 3, float(totals['cash_sale']), AMOUNT_STYLE)
+    worksheet.write(row, 4, float(totals['upi_sale']), AMOUNT_STYLE)
+    worksheet.write(row, 5, float(totals['credit_sale']), AMOUNT_STYLE)
+    
+    return xls_response(workbook, f'{filename}.xls')
 
 def product_sales_report(request):
     """View for product-wise sales report."""
@@ -340,35 +385,9 @@ def product_sales_report(request):
                 )
     else:
         # Check for quick filter in GET parameters
-        quick_filter = request.GET.get('quick_filter', '')
-        if quick_filter == 'today':
-            start_date = end_date = timezone.now().date()
-        elif quick_filter == 'yesterday':
-            start_date = end_date = timezone.now().date() - timedelta(days=1)
-        elif quick_filter == 'this_week':
-            today = timezone.now().date()
-            start_date = today - timedelta(days=today.weekday())
-            end_date = today
-        elif quick_filter == 'this_month':
-            today = timezone.now().date()
-            start_date = today.replace(day=1)
-            end_date = today
-        elif quick_filter == 'last_month':
-            today = timezone.now().date()
-            if today.month == 1:
-                start_date = today.replace(year=today.year-1, month=12, day=1)
-                end_date = today.replace(year=today.year-1, month=12, day=31)
-            else:
-                start_date = today.replace(month=today.month-1, day=1)
-                last_day = 31
-                if today.month-1 in [4, 6, 9, 11]:
-                    last_day = 30
-                elif today.month-1 == 2:
-                    if today.year % 4 == 0 and (today.year % 100 != 0 or today.year % 400 == 0):
-                        last_day = 29
-                    else:
-                        last_day = 28
-                end_date = today.replace(month=today.month-1, day=last_day)
+        quick_range = QUICK_FILTERS.get(request.GET.get('quick_filter', ''))
+        if quick_range:
+            start_date, end_date = quick_range(timezone.now().date())
         
         form = ProductReportForm(initial={
             'date_from': start_date,
@@ -376,16 +395,29 @@ def product_sales_report(request):
             'sort_by': sort_by
         })
     
-    # Get invoices within date range
-    invoices = Invoice.objects.filter(
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date
-    ).exclude(status='draft')
+    # Get all unique variants for the filter dropdown
+    all_variants = product_variants()
     
-    # Get invoice items from these invoices
+    context = {
+        'form': form,
+        **cached_report(_product_sales_data, start_date, end_date, sort_by, product_search, variant_filter, min_quantity),
+        'start_date': start_date,
+        'end_date': end_date,
+        'product_search': product_search,
+        'variant_filter': variant_filter,
+        'min_quantity': min_quantity,
+        'all_variants': all_variants
+    }
+    
+    return render(request, 'reports/product_sales_report.html', context)
+
+def _product_sales_data(start_date, end_date, sort_by, product_search, variant_filter, min_quantity):
+    """Compute the product-wise sales table, totals and top five chart for the given filters."""
+    # Get the items of non-draft invoices within the date range, filtering on the
+    # joined invoice rather than an IN (SELECT ...) over the matching invoices
     invoice_items = InvoiceItem.objects.filter(
-        invoice__in=invoices
-    )
+        created_between(start_date, end_date, 'invoice__created_at')
+    ).exclude(invoice__status='draft')
     
     # Apply product search filter if provided
     if product_search:
@@ -399,15 +431,13 @@ def product_sales_report(request):
     product_data = invoice_items.values(
         'product__name', 'product_quality__quality'
     ).annotate(
-        product=F('product__name'),
-        variant=F('product_quality__quality'),
         quantity_sold=Sum('quantity'),
         revenue=Sum(F('quantity') * F('unit_price'))
     )
     
     # Apply minimum quantity filter if provided
-    if min_quantity and min_quantity.isdigit():
-        min_qty = float(min_quantity)
+    min_qty = parse_quantity(min_quantity)
+    if min_qty is not None:
         product_data = product_data.filter(quantity_sold__gte=min_qty)
     
     # Sort data based on user selection
@@ -416,7 +446,7 @@ def product_sales_report(request):
     elif sort_by == 'revenue':
         product_data = product_data.order_by('-revenue')
     else:  # name
-        product_data = product_data.order_by('product')
+        product_data = product_data.order_by('product__name')
     
     # Convert to list for template
     table_data = list(product_data)
@@ -425,28 +455,20 @@ def product_sales_report(request):
     total_quantity = sum(item['quantity_sold'] for item in table_data) if table_data else 0
     total_revenue = sum(item['revenue'] for item in table_data) if table_data else 0
     
-    # Prepare chart data for top 5 products
-    top_products = sorted(table_data, key=lambda x: x['revenue'], reverse=True)[:5]
-    chart_data = [{'name': item['product'], 'value': float(item['revenue'])} for item in top_products]
-    
-    # Get all unique variants for the filter dropdown
-    all_variants = ProductQuality.objects.values_list('quality', flat=True).distinct()
+    # Prepare chart data for top 5 products; unless the table is already in revenue
+    # order, let the database pick them with a limited query instead of re-sorting
+    if sort_by == 'revenue':
+        top_products = table_data[:5]
+    else:
+        top_products = product_data.order_by('-revenue')[:5]
+    chart_data = [{'name': item['product__name'], 'value': float(item['revenue'])} for item in top_products]
     
-    context = {
-        'form': form,
+    return {
         'table_data': table_data,
         'total_quantity': total_quantity,
         'total_revenue': total_revenue,
-        'start_date': start_date,
-        'end_date': end_date,
-        'chart_data': json.dumps(chart_data),
-        'product_search': product_search,
-        'variant_filter': variant_filter,
-        'min_quantity': min_quantity,
-        'all_variants': all_variants,
+        'chart_data': json.dumps(chart_data)
     }
-    
-    return render(request, 'reports/product_sales_report.html', context)
 
 def customer_summary_report(request):
     """View for customer summary report."""
@@ -479,61 +501,65 @@ def customer_summary_report(request):
             'include_inactive': include_inactive
         })
     
+    context = {
+        'form': form,
+        **cached_report(_customer_summary_data, start_date, end_date, customer_type, sort_by, include_inactive),
+        'start_date': start_date,
+        'end_date': end_date
+    }
+    
+    return render(request, 'reports/customer_summary_report.html', context)
+
+def _customer_summary_data(start_date, end_date, customer_type, sort_by, include_inactive):
+    """Compute the per-customer summary table, totals and top five chart for the given filters."""
     # Start with all customers
-    customers = Customer.objects.all()
+    customers = Customer.objects.only('id', 'name', 'phone')
     
     # Filter by customer type if specified
     if customer_type != 'all':
         customers = customers.filter(customer_type=customer_type)
     
-    # Filter out inactive customers if specified
-    if not include_inactive:
-        # Get customers with invoices in the date range
-        active_customer_ids = Invoice.objects.filter(
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
-        ).values_list('customer_id', flat=True).distinct()
-        
-        customers = customers.filter(id__in=active_customer_ids)
-    
     # Get invoices within date range
-    invoices = Invoice.objects.filter(
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date
-    ).exclude(status='draft')
+    invoices = Invoice.objects.filter(created_between(start_date, end_date)).exclude(status='draft')
+    
+    # Debug: Log all invoices to see what's available (only when debug logging is on,
+    # since it runs an extra count and reads every invoice)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Total invoices in date range: %s", invoices.count())
+        for inv in invoices:
+            logger.debug("Invoice %s: payment_type=%s, status=%s, total=%s, amount_paid=%s",
+                         inv.invoice_number, inv.payment_type, inv.status, inv.total, inv.amount_paid)
+    
+    # Aggregate every customer's invoices in one grouped query
+    customer_stats = {
+        row['customer_id']: row
+        for row in invoices.values('customer_id').annotate(
+            total_orders=Count('id'),
+            total_value=Sum('total'),
+            # Include all invoices with amount_paid < total
+            pending_payment=Sum(
+                F('total') - F('amount_paid'),
+                filter=Q(total__gt=F('amount_paid')),
+                default=0
+            )
+        )
+    }
     
-    # Debug: Log all invoices to see what's available
-    logger.debug(f"Total invoices in date range: {invoices.count()}")
-    for inv in invoices:
-        logger.debug(f"Invoice {inv.invoice_number}: payment_type={inv.payment_type}, status={inv.status}, total={inv.total}, amount_paid={inv.amount_paid}")
+    # Only include customers with orders in the period, unless inactive ones are wanted too
+    if not include_inactive:
+        customers = customers.filter(id__in=customer_stats)
     
-    # Aggregate customer data
     customer_data = []
-    
     for customer in customers:
-        # Get customer's invoices in the date range
-        customer_invoices = invoices.filter(customer=customer)
-        
-        # Calculate metrics
-        total_orders = customer_invoices.count()
-        total_value = customer_invoices.aggregate(total=Sum('total'))['total'] or 0
-        
-        # Calculate pending payments - FIX: Include all invoices with amount_paid < total
-        pending_payment = 0
-        for invoice in customer_invoices:
-            if invoice.total > invoice.amount_paid:
-                pending_payment += (invoice.total - invoice.amount_paid)
-        
-        # Only include customers with orders in the period
-        if total_orders > 0 or include_inactive:
-            customer_data.append({
-                'id': customer.id,
-                'name': customer.name,
-                'phone': customer.phone,
-                'total_orders': total_orders,
-                'total_value': total_value,
-                'pending_payment': pending_payment
-            })
+        stats = customer_stats.get(customer.id, {})
+        customer_data.append({
+            'id': customer.id,
+            'name': customer.name,
+            'phone': customer.phone,
+            'total_orders': stats.get('total_orders', 0),
+            'total_value': stats.get('total_value', 0),
+            'pending_payment': stats.get('pending_payment', 0)
+        })
     
     # Sort data based on user selection
     if sort_by == 'purchases':
@@ -563,19 +589,14 @@ def customer_summary_report(request):
                 'value': float(item['total_value'])
             })
     
-    context = {
-        'form': form,
+    return {
         'table_data': customer_data,
         'total_customers': total_customers,
         'total_orders': total_orders,
         'total_value': total_value,
         'total_pending': total_pending,
-        'start_date': start_date,
-        'end_date': end_date,
         'chart_data': json.dumps(chart_data)
     }
-    
-    return render(request, 'reports/customer_summary_report.html', context)
 
 @login_required
 def credit_overview_report(request):
@@ -600,79 +621,98 @@ def credit_overview_report(request):
             'include_paid': include_paid
         })
     
-    # Debug: Log all invoices to see what's available
-    all_invoices = Invoice.objects.all()
-    logger.debug(f"Total invoices in system: {all_invoices.count()}")
-    for inv in all_invoices:
-        logger.debug(f"Invoice {inv.invoice_number}: payment_type={inv.payment_type}, status={inv.status}, total={inv.total}, amount_paid={inv.amount_paid}")
+    context = {
+        'form': form,
+        **cached_report(_credit_overview_data, sort_by, include_paid, timezone.now().date())
+    }
     
-    # Get all invoices with pending payments
-    # We'll be more inclusive in our query to catch all possible pending payments
-    invoices = Invoice.objects.all()
+    return render(request, 'reports/credit_overview_report.html', context)
+
+def _credit_overview_data(sort_by, include_paid, today):
+    """Compute the credit overview table and totals as of today."""
+    # Debug: Log all invoices to see what's available (only when debug logging is on,
+    # since it runs an extra count and reads every invoice)
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        all_invoices = Invoice.objects.all()
+        logger.debug("Total invoices in system: %s", all_invoices.count())
+        for inv in all_invoices:
+            logger.debug("Invoice %s: payment_type=%s, status=%s, total=%s, amount_paid=%s",
+                         inv.invoice_number, inv.payment_type, inv.status, inv.total, inv.amount_paid)
+    
+    # Get all invoices with pending payments, joining the customer and computing
+    # the amount due and the payment status in the query; only the columns the
+    # table shows are fetched
+    invoices = Invoice.objects.select_related('customer').only(
+        'id', 'invoice_number', 'created_at', 'payment_due_date', 'due_date', 'total',
+        'amount_paid', 'status', 'payment_type', 'customer__name', 'customer__phone'
+    ).annotate(
+        calculated_amount_due=ExpressionWrapper(F('total') - F('amount_paid'), output_field=DecimalField()),
+        effective_due_date=Coalesce('payment_due_date', 'due_date'),
+    ).annotate(
+        payment_status=Case(
+            When(Q(status='paid') | Q(amount_paid__gte=F('total')), then=Value('paid')),
+            When(amount_paid__gt=0, then=Value('partially_paid')),
+            When(effective_due_date__lt=today, then=Value('overdue')),
+            default=Value('pending'),
+            output_field=CharField(),
+        ),
+        # Overdue invoices keep their due date (oldest is most overdue), the rest sort last
+        overdue_since=Case(
+            When(effective_due_date__lt=today, then=F('effective_due_date')),
+            default=None,
+            output_field=DateField(),
+        ),
+    )
     
     # Log the query for debugging
-    logger.debug(f"Initial query count: {invoices.count()}")
+    if debug:
+        logger.debug("Initial query count: %s", invoices.count())
     
-    # Filter out paid invoices if specified
     if not include_paid:
-        # Only include invoices that are not fully paid
-        invoices = invoices.exclude(status='paid')
-        logger.debug(f"After excluding paid: {invoices.count()}")
+        # Only include invoices that are not fully paid and still have an amount due
+        invoices = invoices.exclude(status='paid').filter(calculated_amount_due__gt=0)
+        if debug:
+            logger.debug("After excluding paid: %s", invoices.count())
+    else:
+        # Only include credit invoices or invoices with pending payments
+        invoices = invoices.filter(Q(payment_type='credit') | Q(calculated_amount_due__gt=0))
+    
+    # Sort in the database where the sort key is a column; ties keep the newest invoices first
+    if sort_by == 'due_date':
+        # Sort by due date, putting None values at the end
+        invoices = invoices.order_by(F('effective_due_date').asc(nulls_last=True), '-created_at')
+    elif sort_by == 'amount':
+        invoices = invoices.order_by('-calculated_amount_due', '-created_at')
+    elif sort_by == 'overdue':
+        invoices = invoices.order_by(F('overdue_since').asc(nulls_last=True), '-created_at')
     
     # Prepare data for template
     table_data = []
     
     for invoice in invoices:
-        amount_due = invoice.total - invoice.amount_paid
+        amount_due = invoice.calculated_amount_due
+        due_date = invoice.effective_due_date
         
-        # Skip if there's no amount due and we're not including paid invoices
-        if amount_due <= 0 and not include_paid:
-            continue
+        # Days overdue is only a date subtraction here: extracting days from an
+        # interval in SQL needs a native duration type, which SQLite and MySQL lack
+        days_overdue = (today - invoice.overdue_since).days if invoice.overdue_since else 0
         
-        # Calculate days overdue
-        days_overdue = 0
-        due_date = invoice.payment_due_date or invoice.due_date
-        if due_date and due_date < timezone.now().date():
-            days_overdue = (timezone.now().date() - due_date).days
-        
-        # Determine status
-        if invoice.status == 'paid':
-            status = 'paid'
-        elif amount_due == 0:
-            status = 'paid'
-        elif amount_due < invoice.total:
-            status = 'partially_paid'
-        elif days_overdue > 0:
-            status = 'overdue'
-        else:
-            status = 'pending'
-        
-        # Only include credit invoices or invoices with pending payments
-        if invoice.payment_type == 'credit' or amount_due > 0:
-            table_data.append({
-                'invoice_id': invoice.id,  # Add the invoice ID for URL reversing
-                'invoice_number': invoice.invoice_number,
-                'customer_name': invoice.customer.name,
-                'customer_phone': invoice.customer.phone,
-                'invoice_date': invoice.created_at,
-                'due_date': due_date,
-                'total_amount': invoice.total,
-                'amount_paid': invoice.amount_paid,
-                'amount_due': amount_due,
-                'status': status,
-                'days_overdue': days_overdue
-            })
-    
-    logger.debug(f"Final table data count: {len(table_data)}")
+        table_data.append({
+            'invoice_id': invoice.id,  # Add the invoice ID for URL reversing
+            'invoice_number': invoice.invoice_number,
+            'customer_name': invoice.customer.name,
+            'customer_phone': invoice.customer.phone,
+            'invoice_date': invoice.created_at,
+            'due_date': due_date,
+            'total_amount': invoice.total,
+            'amount_paid': invoice.amount_paid,
+            'amount_due': amount_due,
+            'status': invoice.payment_status,
+            'days_overdue': days_overdue
+        })
     
-    # Sort data based on user selection
-    if sort_by == 'due_date':
-        # Sort by due date, putting None values at the end
-        table_data = sorted(table_data, key=lambda x: (x['due_date'] is None, x['due_date'] or datetime.max.date()))
-    elif sort_by == 'amount':
-        table_data = sorted(table_data, key=lambda x: x['amount_due'], reverse=True)
-    elif sort_by == 'overdue':
-        table_data = sorted(table_data, key=lambda x: x['days_overdue'], reverse=True)
+    logger.debug("Final table data count: %s", len(table_data))
     
     # Calculate totals
     total_invoices = len(table_data)
@@ -680,16 +720,13 @@ def credit_overview_report(request):
     total_paid = sum(item['amount_paid'] for item in table_data)
     total_due = sum(item['amount_due'] for item in table_data)
     
-    context = {
-        'form': form,
+    return {
         'table_data': table_data,
         'total_invoices': total_invoices,
         'total_amount': total_amount,
         'total_paid': total_paid,
         'total_due': total_due
     }
-    
-    return render(request, 'reports/credit_overview_report.html', context)
 
 def export_customer_report(request, start_date, end_date, customer_type, sort_by, include_inactive):
     """Export customer summary report to Excel."""
@@ -700,150 +737,133 @@ def export_customer_report(request, start_date, end_date, customer_type, sort_by
     if customer_type != 'all':
         customers = customers.filter(customer_type=customer_type)
     
-    # Filter out inactive customers if specified
-    if not include_inactive:
-        # Get customers with invoices in the date range
-        active_customer_ids = Invoice.objects.filter(
-            created_at__date__gte=start_date,
-            created_at__date__lte=end_date
-        ).values_list('customer_id', flat=True).distinct()
-        
-        customers = customers.filter(id__in=active_customer_ids)
-    
     # Get invoices within date range
-    invoices = Invoice.objects.filter(
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date
-    ).exclude(status='draft')
+    invoices = Invoice.objects.filter(created_between(start_date, end_date)).exclude(status='draft')
     
     # Create workbook and add a worksheet
     workbook = xlwt.Workbook(encoding='utf-8')
     worksheet = workbook.add_sheet('Customer Summary')
     
-    # Define styles
-    header_style = xlwt.easyxf('font: bold on; align: wrap on, vert centre, horiz center')
-    amount_style = xlwt.easyxf('align: wrap on, vert centre, horiz right', num_format_str='#,##0.00')
-    
     # Write header row
     headers = [
         'Customer', 'Phone', 'Customer Type', 'Total Orders', 
         'Total Value (₹)', 'Pending Payment (₹)'
     ]
     
-    for col, header in enumerate(headers):
-        worksheet.write(0, col, header, header_style)
-        worksheet.col(col).width = 4000  # Set column width
+    write_header_row(worksheet, headers)
+    
+    # Aggregate every customer's invoices in one grouped query
+    customer_stats = {
+        row['customer_id']: row
+        for row in invoices.values('customer_id').annotate(
+            total_orders=Count('id'),
+            total_value=Sum('total'),
+            # Unpaid balance of credit invoices
+            pending_payment=Sum(
+                F('total') - F('amount_paid'),
+                filter=Q(payment_type='credit') & ~Q(status='paid'),
+                default=0
+            )
+        )
+    }
+    
+    # Only include customers with orders in the period, unless inactive ones are wanted too
+    if not include_inactive:
+        customers = customers.filter(id__in=customer_stats)
     
     # Write data rows
+    customer_types = dict(Customer.CUSTOMER_TYPE_CHOICES)
     row = 1
     for customer in customers:
-        # Get customer's invoices in the date range
-        customer_invoices = invoices.filter(customer=customer)
-        
-        # Calculate metrics
-        total_orders = customer_invoices.count()
-        total_value = customer_invoices.aggregate(total=Sum('total'))['total'] or 0
-        pending_payment = customer_invoices.filter(
-            payment_type='credit'
-        ).exclude(
-            status='paid'
-        ).aggregate(
-            pending=Sum(F('total') - F('amount_paid'))
-        )['pending'] or 0
-        
-        # Only include customers with orders in the period
-        if total_orders > 0 or include_inactive:
-            worksheet.write(row, 0, customer.name)
-            worksheet.write(row, 1, customer.phone)
-            worksheet.write(row, 2, dict(Customer.CUSTOMER_TYPE_CHOICES).get(customer.customer_type, 'Unknown'))
-            worksheet.write(row, 3, total_orders)
-            worksheet.write(row, 4, float(total_value), amount_style)
-            worksheet.write(row, 5, float(pending_payment), amount_style)
-            row += 1
+        stats = customer_stats.get(customer.id, {})
+        worksheet.write(row, 0, customer.name)
+        worksheet.write(row, 1, customer.phone)
+        worksheet.write(row, 2, customer_types.get(customer.customer_type, 'Unknown'))
+        worksheet.write(row, 3, stats.get('total_orders', 0))
+        worksheet.write(row, 4, float(stats.get('total_value', 0)), AMOUNT_STYLE)
+        worksheet.write(row, 5, float(stats.get('pending_payment', 0)), AMOUNT_STYLE)
+        row += 1
+    
+    # Write totals row, aggregated over all the invoices in one query
+    totals = invoices.aggregate(
+        total_orders=Count('id'),
+        total_value=Sum('total', default=0),
+        pending_payment=Sum(
+            F('total') - F('amount_paid'),
+            filter=Q(payment_type='credit') & ~Q(status='paid'),
+            default=0
+        )
+    )
+    worksheet.write(row, 0, 'Total', HEADER_STYLE)
+    worksheet.write(row, 1, '', HEADER_STYLE)
+    worksheet.write(row, 2, '', HEADER_STYLE)
+    worksheet.write(row, 3, totals['total_orders'])
+    worksheet.write(row, 4, float(totals['total_value']), AMOUNT_STYLE)
+    worksheet.write(row, 5, float(totals['pending_payment']), AMOUNT_STYLE)
     
-    # Write totals row
-    worksheet.write(row, 0, 'Total', header_style)
-    worksheet.write(row, 1, '', header_style)
-    worksheet.write(row, 2, '', header_style)
-    worksheet.write(row, 3, sum(invoices.values('customer').annotate(count=Count('id')).values_list('count', flat=True)))
-    worksheet.write(row, 4, float(invoices.aggregate(total=Sum('total'))['total'] or 0), amount_style)
-    worksheet.write(row, 5, float(
-        invoices.filter(payment_type='credit').exclude(status='paid').aggregate(
-            pending=Sum(F('total') - F('amount_paid'))
-        )['pending'] or 0
-    ), amount_style)
-    
-    # Create HTTP response with Excel file
-    response = HttpResponse(content_type='application/ms-excel')
     current_date = timezone.now().strftime('%Y-%m-%d')
-    response['Content-Disposition'] = f'attachment; filename="Customer_Summary_{current_date}.xls"'
-    workbook.save(response)
-    
-    return response
+    return xls_response(workbook, f'Customer_Summary_{current_date}.xls')
 
 def export_credit_report(request, include_paid=False):
     """Export credit report to Excel."""
-    # Get invoices with credit payment type
+    # Get invoices with credit payment type as plain rows, computing the amount due
+    # in the query and joining the customer's name and phone. The amounts are cast
+    # to floats by the database, as xlwt writes them, instead of building a Decimal
+    # for each one
     invoices = Invoice.objects.filter(payment_type='credit')
     
     if not include_paid:
         invoices = invoices.exclude(status='paid')
     
+    invoices = invoices.annotate(
+        total_amount=Cast('total', FloatField()),
+        paid_amount=Cast('amount_paid', FloatField()),
+        calculated_amount_due=Cast(F('total') - F('amount_paid'), FloatField()),
+    ).values(
+        'invoice_number', 'customer__name', 'customer__phone', 'created_at', 'payment_due_date',
+        'due_date', 'total_amount', 'paid_amount', 'calculated_amount_due', 'status'
+    )
+    
     # Create workbook and add a worksheet
     workbook = xlwt.Workbook(encoding='utf-8')
     worksheet = workbook.add_sheet('Credit Overview')
     
-    # Define styles
-    header_style = xlwt.easyxf('font: bold on; align: wrap on, vert centre, horiz center')
-    date_style = xlwt.easyxf('align: wrap on, vert centre, horiz center', num_format_str='DD-MM-YYYY')
-    amount_style = xlwt.easyxf('align: wrap on, vert centre, horiz right', num_format_str='#,##0.00')
-    
     # Write header row
     headers = [
         'Invoice #', 'Customer', 'Phone', 'Invoice Date', 'Due Date', 
         'Total Amount', 'Amount Paid', 'Amount Due', 'Status', 'Days Overdue'
     ]
     
-    for col, header in enumerate(headers):
-        worksheet.write(0, col, header, header_style)
-        worksheet.col(col).width = 4000  # Set column width
+    write_header_row(worksheet, headers)
     
-    # Write data rows
-    for row, invoice in enumerate(invoices, 1):
-        amount_due = invoice.total - invoice.amount_paid
-        days_overdue = (timezone.now().date() - invoice.due_date).days if invoice.due_date and invoice.due_date < timezone.now().date() else 0
+    # Write data rows, streaming them from the database in chunks
+    status_labels = dict(Invoice.STATUS_CHOICES)
+    today = timezone.now().date()
+    for row, invoice in enumerate(invoices.iterator(chunk_size=2000), 1):
+        due_date = invoice['due_date']
+        days_overdue = max(0, (today - due_date).days) if due_date else 0
         
-        worksheet.write(row, 0, invoice.invoice_number)
-        worksheet.write(row, 1, invoice.customer.name)
-        worksheet.write(row, 2, invoice.customer.phone)
-        worksheet.write(row, 3, invoice.created_at.date(), date_style)
-        worksheet.write(row, 4, invoice.payment_due_date or invoice.due_date or '', date_style)
-        worksheet.write(row, 5, float(invoice.total), amount_style)
-        worksheet.write(row, 6, float(invoice.amount_paid), amount_style)
-        worksheet.write(row, 7, float(amount_due), amount_style)
-        worksheet.write(row, 8, dict(Invoice.STATUS_CHOICES).get(invoice.status, invoice.status))
+        worksheet.write(row, 0, invoice['invoice_number'])
+        worksheet.write(row, 1, invoice['customer__name'])
+        worksheet.write(row, 2, invoice['customer__phone'])
+        worksheet.write(row, 3, invoice['created_at'].date(), DATE_STYLE)
+        worksheet.write(row, 4, invoice['payment_due_date'] or due_date or '', DATE_STYLE)
+        worksheet.write(row, 5, invoice['total_amount'], AMOUNT_STYLE)
+        worksheet.write(row, 6, invoice['paid_amount'], AMOUNT_STYLE)
+        worksheet.write(row, 7, invoice['calculated_amount_due'], AMOUNT_STYLE)
+        worksheet.write(row, 8, status_labels.get(invoice['status'], invoice['status']))
         worksheet.write(row, 9, days_overdue)
     
-    # Create HTTP response with Excel file
-    response = HttpResponse(content_type='application/ms-excel')
     current_date = timezone.now().strftime('%Y-%m-%d')
-    response['Content-Disposition'] = f'attachment; filename="Credit_Overview_Report_{current_date}.xls"'
-    workbook.save(response)
-    
-    return response
+    return xls_response(workbook, f'Credit_Overview_Report_{current_date}.xls')
 
 def export_product_report(request, start_date, end_date, sort_by, product_search='', variant_filter='', min_quantity=''):
     """Export product sales report to Excel."""
-    # Get invoices within date range
-    invoices = Invoice.objects.filter(
-        created_at__date__gte=start_date,
-        created_at__date__lte=end_date
-    ).exclude(status='draft')
-    
-    # Get invoice items from these invoices
+    # Get the items of non-draft invoices within the date range, filtering on the
+    # joined invoice rather than an IN (SELECT ...) over the matching invoices
     invoice_items = InvoiceItem.objects.filter(
-        invoice__in=invoices
-    )
+        created_between(start_date, end_date, 'invoice__created_at')
+    ).exclude(invoice__status='draft')
     
     # Apply product search filter if provided
     if product_search:
@@ -853,19 +873,17 @@ def export_product_report(request, start_date, end_date, sort_by, product_search
     if variant_filter:
         invoice_items = invoice_items.filter(product_quality__quality=variant_filter)
     
-    # Aggregate data by product and variant
+    # Aggregate data by product and variant, cast to floats in the database
     product_data = invoice_items.values(
         'product__name', 'product_quality__quality'
     ).annotate(
-        product=F('product__name'),
-        variant=F('product_quality__quality'),
-        quantity_sold=Sum('quantity'),
-        revenue=Sum(F('quantity') * F('unit_price'))
+        quantity_sold=Cast(Sum('quantity'), FloatField()),
+        revenue=Cast(Sum(F('quantity') * F('unit_price')), FloatField())
     )
     
     # Apply minimum quantity filter if provided
-    if min_quantity and min_quantity.isdigit():
-        min_qty = float(min_quantity)
+    min_qty = parse_quantity(min_quantity)
+    if min_qty is not None:
         product_data = product_data.filter(quantity_sold__gte=min_qty)
     
     # Sort data based on user selection
@@ -874,61 +892,62 @@ def export_product_report(request, start_date, end_date, sort_by, product_search
     elif sort_by == 'revenue':
         product_data = product_data.order_by('-revenue')
     else:  # name
-        product_data = product_data.order_by('product')
+        product_data = product_data.order_by('product__name')
     
     # Create workbook and add a worksheet
     workbook = xlwt.Workbook(encoding='utf-8')
     worksheet = workbook.add_sheet('Product Sales')
     
-    # Define styles
-    header_style = xlwt.easyxf('font: bold on; align: wrap on, vert centre, horiz center')
-    amount_style = xlwt.easyxf('align: wrap on, vert centre, horiz right', num_format_str='#,##0.00')
-    
     # Write header row
     headers = [
         'Product', 'Variant', 'Qty Sold (Kg)', 'Revenue (₹)'
     ]
     
-    for col, header in enumerate(headers):
-        worksheet.write(0, col, header, header_style)
-        worksheet.col(col).width = 4000  # Set column width
-    
-    # Write data rows
-    for row, item in enumerate(product_data, 1):
-        worksheet.write(row, 0, item['product'])
-        worksheet.write(row, 1, item['variant'] or 'Standard')
-        worksheet.write(row, 2, float(item['quantity_sold']), amount_style)
-        worksheet.write(row, 3, float(item['revenue']), amount_style)
+    write_header_row(worksheet, headers)
+    
+    # Write data rows, streamed from the database as tuples in chunks, adding up
+    # the totals in the same pass and starting a new sheet whenever the current
+    # one is full
+    row = 0
+    sheet_number = 1
+    total_quantity = total_revenue = 0
+    rows = product_data.values_list(
+        'product__name', 'product_quality__quality', 'quantity_sold', 'revenue'
+    ).iterator(chunk_size=5000)
+    for name, variant, quantity_sold, revenue in rows:
+        if row == SHEET_ROWS:
+            sheet_number += 1
+            worksheet = workbook.add_sheet(f'Product Sales {sheet_number}')
+            write_header_row(worksheet, headers)
+            row = 0
+        row += 1
+        worksheet.write(row, 0, name)
+        worksheet.write(row, 1, variant or 'Standard')
+        worksheet.write(row, 2, quantity_sold, AMOUNT_STYLE)
+        worksheet.write(row, 3, revenue, AMOUNT_STYLE)
+        total_quantity += quantity_sold
+        total_revenue += revenue
     
     # Write totals row
-    row = len(product_data) + 1
-    worksheet.write(row, 0, 'Total', header_style)
-    worksheet.write(row, 1, '', header_style)
-    worksheet.write(row, 2, float(sum(item['quantity_sold'] for item in product_data)), amount_style)
-    worksheet.write(row, 3, float(sum(item['revenue'] for item in product_data)), amount_style)
-    
-    # Create HTTP response with Excel file
-    response = HttpResponse(content_type='application/ms-excel')
-    current_date = timezone.now().strftime('%Y-%m-%d')
+    row += 1
+    worksheet.write(row, 0, 'Total', HEADER_STYLE)
+    worksheet.write(row, 1, '', HEADER_STYLE)
+    worksheet.write(row, 2, total_quantity, AMOUNT_STYLE)
+    worksheet.write(row, 3, total_revenue, AMOUNT_STYLE)
     
     # Include filter information in filename
+    current_date = timezone.now().strftime('%Y-%m-%d')
     filename_parts = ['Product_Sales']
     if start_date and end_date:
-        if start_date == end_date:
-            filename_parts.append(start_date.strftime('%Y-%m-%d'))
-        else:
-            filename_parts.append(f"{start_date.strftime('%Y-%m-%d')}_to_{end_date.strftime('%Y-%m-%d')}")
+        filename_parts.append(date_range_label(start_date, end_date))
     
     if product_search:
-        filename_parts.append(f"search_{product_search}")
+        filename_parts.append(f"search_{filename_part(product_search)}")
     
     if variant_filter:
-        filename_parts.append(f"variant_{variant_filter}")
+        filename_parts.append(f"variant_{filename_part(variant_filter)}")
     
     filename_parts.append(current_date)
     filename = '_'.join(filename_parts) + '.xls'
     
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    workbook.save(response)
-    
-    return response
+    return xls_response(workbook, filename)